@@ -0,0 +1,225 @@
+# Deterministic benchmarks for the simulation and rendering hot paths.
+#
+# Every scenario is seeded and runs headless (SDL dummy video driver), so two runs on
+# the same machine differ only in timing noise. Results are printed (or written with
+# --out) as JSON: one entry per level with update throughput, _frog_on_platform
+# queries, LaneTimelines build and lookups, _build_level latency, SpriteBank cold vs
+# warm draw cost and peak traced memory. Compare two result files before shipping a
+# web build.
+#
+#   python benchmarks/run_benchmarks.py --out bench.json
+#   python benchmarks/run_benchmarks.py --levels 1 10 --quick
+
+import argparse
+import json
+import os
+import platform
+import random
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+import pygame  # noqa: E402
+
+from frog_crossing import ACTION_INPUTS, HEIGHT, WIDTH, FrogSim, SpriteBank  # noqa: E402
+
+
+LEVELS = (1, 5, 10, 20)
+SEED = 1234
+# Weights over ACTION_INPUTS for the seeded random policy: mostly idle, some hops and
+# walks. frog_stress.py and tools/check_determinism.py drive the frog with it too.
+POLICY_WEIGHTS = (6, 2, 1, 2, 2, 1)
+
+
+def _best(fn, repeat: int) -> float:
+    # Shortest of repeat runs: the least disturbed by whatever else the machine did.
+    return min(fn() for _ in range(repeat))
+
+
+def _percentile(values: list[float], q: float) -> float:
+    ordered = sorted(values)
+    return ordered[round(q * (len(ordered) - 1))]
+
+
+def bench_update(level: int, frames: int, repeat: int) -> dict:
+    # FrogSim.step driven by the seeded random policy.
+    rng = random.Random(SEED)
+    inputs = rng.choices(ACTION_INPUTS, weights=POLICY_WEIGHTS, k=frames)
+
+    def run() -> float:
+        sim = FrogSim(level, seed=SEED)
+        start = time.perf_counter()
+        for inp in inputs:
+            sim.step(inp)
+        return time.perf_counter() - start
+
+    seconds = _best(run, repeat)
+    return {"frames": frames, "seconds": seconds, "frames_per_sec": frames / seconds}
+
+
+def bench_support(level: int, queries: int, repeat: int) -> dict:
+    # _frog_on_platform from seeded frog positions spread over the water band.
+    sim = FrogSim(level, seed=SEED)
+    rng = random.Random(SEED)
+    area = sim.water_area
+    points = [(rng.randrange(area.left, area.right), rng.randrange(area.top, area.bottom)) for _ in range(queries)]
+    frog = sim.frog.rect
+
+    def run() -> float:
+        query = sim._frog_on_platform
+        start = time.perf_counter()
+        for center in points:
+            frog.center = center
+            query()
+        return time.perf_counter() - start
+
+    seconds = _best(run, repeat)
+    return {"calls": queries, "seconds": seconds, "calls_per_sec": queries / seconds}
+
+
+def bench_timelines(level: int, queries: int, repeat: int) -> dict:
+    # LaneTimelines: build cost, then support lookups at seeded (x, y, frame) points
+    # up to a minute ahead, none of which step the sim.
+    sim = FrogSim(level, seed=SEED)
+    start = time.perf_counter()
+    timelines = sim.lane_timelines()
+    build = time.perf_counter() - start
+    rng = random.Random(SEED)
+    area = sim.water_area
+    points = [
+        (rng.randrange(area.left, area.right), rng.randrange(area.top, area.bottom), rng.randrange(3600))
+        for _ in range(queries)
+    ]
+
+    def run() -> float:
+        query = timelines.support
+        start = time.perf_counter()
+        for x, y, t in points:
+            query(x, y, t)
+        return time.perf_counter() - start
+
+    seconds = _best(run, repeat)
+    return {"build_ms": build * 1000.0, "calls": queries, "seconds": seconds, "calls_per_sec": queries / seconds}
+
+
+def bench_build(level: int, builds: int) -> dict:
+    sim = FrogSim(level, seed=SEED)
+    times = []
+    for _ in range(builds):
+        start = time.perf_counter()
+        sim._build_level(level)
+        times.append((time.perf_counter() - start) * 1000.0)
+    return {
+        "builds": builds,
+        "mean_ms": sum(times) / len(times),
+        "p50_ms": _percentile(times, 0.50),
+        "p95_ms": _percentile(times, 0.95),
+        "max_ms": max(times),
+    }
+
+
+def _draw_all(sim: FrogSim, surf: pygame.Surface, sprites: SpriteBank) -> None:
+    for p in sim.platforms:
+        p.draw(surf, sprites)
+    for c in sim.crocs:
+        c.draw(surf, sprites)
+    for f in sim.flies:
+        f.draw(surf, sprites)
+    sim.frog.draw(surf, sprites)
+
+
+def bench_sprites(level: int, frames: int, screen: pygame.Surface) -> dict:
+    # Cold: first draw of a level with an empty SpriteBank (loads, scales, rotations).
+    # Warm: the same scene drawn again and again from the filled caches.
+    sim = FrogSim(level, seed=SEED)
+    sprites = SpriteBank(ROOT / "assets")
+    start = time.perf_counter()
+    _draw_all(sim, screen, sprites)
+    cold = time.perf_counter() - start
+
+    warm = []
+    for _ in range(frames):
+        sim.step(ACTION_INPUTS[0])
+        start = time.perf_counter()
+        _draw_all(sim, screen, sprites)
+        warm.append((time.perf_counter() - start) * 1000.0)
+    return {
+        "cold_ms": cold * 1000.0,
+        "warm_p50_ms": _percentile(warm, 0.50),
+        "warm_p95_ms": _percentile(warm, 0.95),
+        "cache": sprites.stats(),
+    }
+
+
+def bench_memory(level: int, frames: int, screen: pygame.Surface) -> dict:
+    # Peak Python allocations for building the level and playing/drawing it.
+    # Surface pixel buffers live outside the Python heap; see sprites.cache.bytes.
+    tracemalloc.start()
+    try:
+        sim = FrogSim(level, seed=SEED)
+        sprites = SpriteBank(ROOT / "assets")
+        for _ in range(frames):
+            sim.step(ACTION_INPUTS[0])
+            _draw_all(sim, screen, sprites)
+        current, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return {"current_kib": current / 1024.0, "peak_kib": peak / 1024.0}
+
+
+def run(levels: list[int], quick: bool) -> dict:
+    scale = 10 if quick else 1
+    repeat = 1 if quick else 3
+    pygame.display.init()
+    screen = pygame.display.set_mode((WIDTH, HEIGHT))
+
+    results = {}
+    for level in levels:
+        results[str(level)] = {
+            "update": bench_update(level, 6000 // scale, repeat),
+            "frog_on_platform": bench_support(level, 50_000 // scale, repeat),
+            "lane_timelines": bench_timelines(level, 50_000 // scale, repeat),
+            "build_level": bench_build(level, 50 // scale),
+            "sprites": bench_sprites(level, 300 // scale, screen),
+            "memory": bench_memory(level, 300 // scale, screen),
+        }
+    pygame.quit()
+    return {
+        "meta": {
+            "seed": SEED,
+            "quick": quick,
+            "python": platform.python_version(),
+            "pygame": pygame.version.ver,
+            "platform": platform.platform(),
+            "video_driver": os.environ.get("SDL_VIDEODRIVER"),
+        },
+        "levels": results,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Frog Crossing benchmarks")
+    parser.add_argument("--levels", type=int, nargs="+", default=list(LEVELS))
+    parser.add_argument("--quick", action="store_true", help="10x fewer iterations, single repeat")
+    parser.add_argument("--out", help="write JSON here instead of stdout")
+    args = parser.parse_args()
+
+    # Set here rather than at import, so importing POLICY_WEIGHTS (frog_stress.py
+    # --window) doesn't force a headless display.
+    os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+    report = run(args.levels, args.quick)
+    text = json.dumps(report, indent=2)
+    if args.out:
+        Path(args.out).write_text(text + "\n")
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
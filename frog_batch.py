@@ -0,0 +1,471 @@
+# Vectorized Frog Crossing: N independent games advanced together with NumPy.
+#
+# Mirrors FrogSim.step (Platform.update, the lane ring wrap, Fly.update bouncing,
+# _frog_on_platform's "largest overlap wins", crocs, flies and the win check) on
+# struct-of-arrays state. Level layouts still come from FrogSim._build_level, so a
+# batch env plays exactly the levels the real game would generate.
+#
+# NumPy is only needed here (and in frog_env); the game itself never imports it,
+# which keeps the pygbag web build free of it.
+
+from dataclasses import dataclass
+
+import numpy as np
+
+from frog_crossing import (
+    ACTIONS,
+    HEIGHT,
+    HUD_H,
+    STEP_X,
+    STEP_Y,
+    WALK_SPEED,
+    WIDTH,
+    FrogSim,
+)
+
+
+# tuning_for_level caps levels at 12 lanes, 6 flies and 6 + 6 (extras) platforms per lane.
+MAX_LANES = 12
+MAX_PLATFORMS_PER_LANE = 12
+MAX_FLIES = 6
+
+ACTION_NOOP, ACTION_UP, ACTION_DOWN, ACTION_LEFT, ACTION_RIGHT, ACTION_JUMP = range(len(ACTIONS))
+
+# Hitbox sizes, matching Frog, Crocodile and Fly.
+FROG_W, FROG_H = 34, 28
+CROC_W, CROC_H = 46, 18
+FLY_R = 6
+
+# Platform.needs_wrap margins.
+WRAP_MARGIN = 60
+
+_FAR = 1 << 40
+
+# Per-env arrays that make up a level layout (see BatchSim.layout_pool).
+_LAYOUT_FIELDS = (
+    "lane_valid", "lane_top", "lane_h", "lane_speed", "lane_dx", "lane_shift", "_lead",
+    "plat_base", "plat_w", "plat_rank", "plat_valid", "croc", "croc_offset",
+    "fly_pos", "fly_vel", "fly_valid",
+)
+
+
+@dataclass
+class BatchStepResult:
+    deaths: np.ndarray
+    flies_eaten: np.ndarray
+    level_complete: np.ndarray
+
+
+class BatchSim:
+    def __init__(self, n: int, level: int = 1, seed: int | None = None, layout_pool: int = 0) -> None:
+        self.n = n
+        self.rng = np.random.default_rng(seed)
+
+        # Generating a level is plain Python (~ms) and dominates throughput when
+        # agents die a lot. With layout_pool > 0, each level keeps up to that many
+        # generated layouts and rebuilds draw from them with self.rng instead.
+        self.layout_pool = layout_pool
+        self._pools: dict[int, list[tuple[np.ndarray, ...]]] = {}
+
+        # One headless FrogSim is reused to generate every env's level layout.
+        self._builder = FrogSim(level, seed=seed)
+        b = self._builder
+        self.lane_gap = b.lane_gap
+        self.max_lives = b.max_lives
+        self.start_x = float(b.start_pos.x)
+        self.start_y = float(b.start_pos.y)
+        self.water = tuple(b.water_area)
+        self.safe_top = tuple(b.safe_top)
+        self.fly_area = tuple(b.water_area.inflate(-20, -20))
+
+        L, P, F = MAX_LANES, MAX_PLATFORMS_PER_LANE, MAX_FLIES
+        self.level = np.full(n, level, dtype=np.int64)
+        self.score = np.zeros(n, dtype=np.int64)
+        self.lives = np.full(n, self.max_lives, dtype=np.int64)
+        self.deaths = np.zeros(n, dtype=np.int64)
+        self.flies_eaten = np.zeros(n, dtype=np.int64)
+
+        self.fx = np.full(n, self.start_x)
+        self.fy = np.full(n, self.start_y)
+        self.cooldown = np.zeros(n, dtype=np.int64)
+        self.last_dir = np.ones(n, dtype=np.int64)
+        self.left_held = np.zeros(n, dtype=bool)
+        self.right_held = np.zeros(n, dtype=bool)
+
+        self.lane_valid = np.zeros((n, L), dtype=bool)
+        self.lane_top = np.zeros((n, L), dtype=np.int64)
+        self.lane_h = np.zeros((n, L), dtype=np.int64)
+        self.lane_speed = np.zeros((n, L))
+        self.lane_dx = np.zeros((n, L), dtype=np.int64)
+
+        # Platforms are stored relative to a per-lane shift, so moving every lane is
+        # an (n, lanes) add; a platform's screen x is plat_base + lane_shift. Only
+        # lanes whose leading edge crosses the wrap margin touch their slots.
+        # plat_rank is the index in FrogSim.platforms, which breaks ties in the
+        # support check the same way FrogSim does.
+        self.lane_shift = np.zeros((n, L), dtype=np.int64)
+        self._lead = np.zeros((n, L), dtype=np.int64)
+        self.plat_base = np.zeros((n, L, P), dtype=np.int64)
+        self.plat_w = np.zeros((n, L, P), dtype=np.int64)
+        self.plat_rank = np.zeros((n, L, P), dtype=np.int64)
+        self.plat_valid = np.zeros((n, L, P), dtype=bool)
+        self.croc = np.zeros((n, L, P), dtype=bool)
+        self.croc_offset = np.zeros((n, L, P), dtype=np.int64)
+
+        self.fly_pos = np.zeros((n, F, 2))
+        self.fly_vel = np.zeros((n, F, 2))
+        self.fly_valid = np.zeros((n, F), dtype=bool)
+
+        for e in range(n):
+            self._load_level(e, level)
+
+    @classmethod
+    def from_sims(cls, sims: list[FrogSim], seed: int | None = None) -> "BatchSim":
+        # Copy the exact state of existing games, e.g. to check the batch engine
+        # against FrogSim frame by frame.
+        batch = cls(len(sims), level=sims[0].level, seed=seed)
+        for e, sim in enumerate(sims):
+            batch._copy_sim(e, sim)
+            batch.level[e] = sim.level
+            batch.score[e] = sim.score
+            batch.lives[e] = sim.lives
+            batch.last_dir[e] = sim.last_horizontal_dir
+        return batch
+
+    def _load_level(self, e: int, level: int) -> None:
+        pool = self._pools.setdefault(level, [])
+        if self.layout_pool and len(pool) >= self.layout_pool:
+            layout = pool[self.rng.integers(len(pool))]
+            for name, value in zip(_LAYOUT_FIELDS, layout):
+                getattr(self, name)[e] = value
+            self.fx[e] = self.start_x
+            self.fy[e] = self.start_y
+            self.cooldown[e] = self._builder.frog._move_cooldown
+        else:
+            self._builder._build_level(level)
+            self._copy_sim(e, self._builder)
+            if self.layout_pool:
+                pool.append(tuple(getattr(self, name)[e].copy() for name in _LAYOUT_FIELDS))
+        self.level[e] = level
+        self.lives[e] = self.max_lives
+
+    def _copy_sim(self, e: int, sim: FrogSim) -> None:
+        rank = {id(p): i for i, p in enumerate(sim.platforms)}
+        crocs = {id(c.platform): c.offset_x for c in sim.crocs}
+
+        self.lane_valid[e] = False
+        self.plat_valid[e] = False
+        self.plat_base[e] = 0
+        self.lane_shift[e] = 0
+        self.lane_dx[e] = 0
+        self.plat_w[e] = 0
+        self.croc[e] = False
+        self.croc_offset[e] = 0
+        for lane_id, plats in sim.lanes.items():
+            first = plats[0]
+            self.lane_valid[e, lane_id] = True
+            self.lane_top[e, lane_id] = first.rect.top
+            self.lane_h[e, lane_id] = first.rect.height
+            self.lane_speed[e, lane_id] = first.speed
+            self.lane_dx[e, lane_id] = int(first.speed)
+            for k, p in enumerate(plats):
+                self.plat_valid[e, lane_id, k] = True
+                self.plat_base[e, lane_id, k] = p.rect.x
+                self.plat_w[e, lane_id, k] = p.rect.width
+                self.plat_rank[e, lane_id, k] = rank[id(p)]
+                if id(p) in crocs:
+                    self.croc[e, lane_id, k] = True
+                    self.croc_offset[e, lane_id, k] = crocs[id(p)]
+        self._refresh_lead(np.full(MAX_LANES, e), np.arange(MAX_LANES))
+
+        self.fly_valid[e] = False
+        for j, f in enumerate(sim.flies):
+            self.fly_valid[e, j] = True
+            self.fly_pos[e, j] = (f.pos.x, f.pos.y)
+            self.fly_vel[e, j] = (f.vel.x, f.vel.y)
+
+        self.fx[e] = sim.frog.pos.x
+        self.fy[e] = sim.frog.pos.y
+        self.cooldown[e] = sim.frog._move_cooldown
+
+    def platform_left(self) -> np.ndarray:
+        # Screen x of every platform slot, (n, lanes, slots).
+        return self.plat_base + self.lane_shift[:, :, None]
+
+    def _refresh_lead(self, env: np.ndarray, lane: np.ndarray) -> None:
+        # Leading edge per lane in base coordinates: the right-most left edge for
+        # lanes moving right, the left-most right edge for lanes moving left.
+        valid = self.plat_valid[env, lane]
+        x = self.plat_base[env, lane]
+        right = np.where(valid, x, -_FAR).max(axis=1)
+        left = np.where(valid, x + self.plat_w[env, lane], _FAR).min(axis=1)
+        self._lead[env, lane] = np.where(self.lane_speed[env, lane] > 0, right, left)
+
+    # --- frog geometry -------------------------------------------------------
+
+    def _frog_rect(self, idx: np.ndarray) -> tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        # pygame.Rect(center=(int(x), int(y))) for the frog hitbox.
+        left = np.trunc(self.fx[idx]).astype(np.int64) - FROG_W // 2
+        top = np.trunc(self.fy[idx]).astype(np.int64) - FROG_H // 2
+        return left, top, left + FROG_W, top + FROG_H
+
+    def _in_water(self, idx: np.ndarray) -> np.ndarray:
+        wx, wy, ww, wh = self.water
+        cx = np.trunc(self.fx[idx]).astype(np.int64)
+        cy = np.trunc(self.fy[idx]).astype(np.int64)
+        return (cx >= wx) & (cx < wx + ww) & (cy >= wy) & (cy < wy + wh)
+
+    def _candidate_lanes(self, idx: np.ndarray, band_top: np.ndarray, band_h: np.ndarray, ft: np.ndarray, fb: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        # The frog is shorter than the lane pitch, so it overlaps at most two lane bands.
+        oh = np.minimum(fb[:, None], band_top + band_h) - np.maximum(ft[:, None], band_top)
+        oh = np.where(self.lane_valid[idx], np.maximum(oh, 0), 0)
+        rows = np.arange(idx.size)
+        l1 = np.argmax(oh, axis=1)
+        oh1 = oh[rows, l1]
+        oh[rows, l1] = -1
+        l2 = np.argmax(oh, axis=1)
+        oh2 = np.maximum(oh[rows, l2], 0)
+        return np.stack([l1, l2], axis=1), np.stack([oh1, oh2], axis=1)
+
+    @staticmethod
+    def _rows(a: np.ndarray) -> np.ndarray:
+        # (n, lanes, slots) viewed as one row per (env, lane); a single flat index
+        # gathers much faster than a broadcast (env, lane) pair.
+        return a.reshape(-1, MAX_PLATFORMS_PER_LANE)
+
+    @staticmethod
+    def _lane_rows(idx: np.ndarray, lanes: np.ndarray) -> np.ndarray:
+        return idx[:, None] * MAX_LANES + lanes
+
+    def _support(self, idx: np.ndarray) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        # Vectorized _frog_on_platform: (found, lane, slot) per env in idx.
+        if idx.size == 0:
+            empty = np.zeros(0, dtype=np.int64)
+            return np.zeros(0, dtype=bool), empty, empty
+        fl, ft, fr, fb = self._frog_rect(idx)
+        lanes, oh = self._candidate_lanes(idx, self.lane_top[idx], self.lane_h[idx], ft, fb)
+        row = self._lane_rows(idx, lanes)
+        x = self._rows(self.plat_base)[row] + self.lane_shift.reshape(-1)[row][:, :, None]
+        w = self._rows(self.plat_w)[row]
+        ow = np.minimum(fr[:, None, None], x + w) - np.maximum(fl[:, None, None], x)
+        area = np.maximum(ow, 0) * oh[:, :, None]
+        # Biggest overlap wins; ties go to the platform built first.
+        key = area * 4096 - self._rows(self.plat_rank)[row]
+        rows = np.arange(idx.size)
+        best = np.argmax(key.reshape(idx.size, -1), axis=1)
+        found = area.reshape(idx.size, -1)[rows, best] > 0
+        lane = lanes[rows, best // MAX_PLATFORMS_PER_LANE]
+        slot = best % MAX_PLATFORMS_PER_LANE
+        return found, lane, slot
+
+    def _clamp(self, idx: np.ndarray) -> None:
+        hw, hh = FROG_W / 2, FROG_H / 2
+        self.fx[idx] = np.clip(self.fx[idx], hw, WIDTH - hw)
+        self.fy[idx] = np.clip(self.fy[idx], HUD_H + hh, HEIGHT - hh)
+
+    # --- rules ---------------------------------------------------------------
+
+    def _attempt_hop(self, idx: np.ndarray, dx: int | np.ndarray, dy: int) -> None:
+        ready = self.cooldown[idx] <= 0
+        idx = idx[ready]
+        if np.ndim(dx):
+            dx = dx[ready]
+        if idx.size == 0:
+            return
+
+        prev_y = self.fy[idx]
+        self.fx[idx] += dx
+        self.fy[idx] += dy
+        self.cooldown[idx] = 6
+        self._clamp(idx)
+        if np.ndim(dx):
+            moved = dx != 0
+            self.last_dir[idx[moved]] = np.sign(dx[moved])
+        elif dx != 0:
+            self.last_dir[idx] = 1 if dx > 0 else -1
+
+        # If the hop ends in water on a platform, snap to the platform center.
+        wet = idx[self._in_water(idx)]
+        if wet.size:
+            found, lane, slot = self._support(wet)
+            s, lane, slot = wet[found], lane[found], slot[found]
+            plat_x = self.plat_base[s, lane, slot] + self.lane_shift[s, lane]
+            self.fx[s] = plat_x + self.plat_w[s, lane, slot] // 2
+            self.fy[s] = self.lane_top[s, lane] + self.lane_h[s, lane] // 2
+            self._clamp(s)
+
+        self.score[idx] += 5 * (self.fy[idx] < prev_y)
+
+    def _press_side(self, idx: np.ndarray, direction: int) -> None:
+        # On a platform in water: walking is handled per-frame; on land: hop.
+        supported = np.zeros(idx.size, dtype=bool)
+        wet = self._in_water(idx)
+        if wet.any():
+            supported[wet] = self._support(idx[wet])[0]
+        self.last_dir[idx[supported]] = direction
+        self._attempt_hop(idx[~supported], direction * STEP_X, 0)
+
+    def _kill(self, idx: np.ndarray, rebuild: np.ndarray) -> None:
+        # _handle_death_reset; level rebuilds are deferred to the end of the step,
+        # which is safe because the frog is back on the start bank by then.
+        if idx.size == 0:
+            return
+        self.deaths[idx] += 1
+        self.lives[idx] -= 1
+        rebuild[idx[self.lives[idx] <= 0]] = True
+        self.fx[idx] = self.start_x
+        self.fy[idx] = self.start_y
+        self.cooldown[idx] = 10
+
+    def _update_lanes(self) -> None:
+        self.lane_shift += self.lane_dx
+
+        right = self.lane_speed > 0
+        edge = self._lead + self.lane_shift
+        need_lane = self.lane_valid & np.where(right, edge > WIDTH + WRAP_MARGIN, edge < -WRAP_MARGIN)
+        env, lane = np.nonzero(need_lane)
+        if env.size == 0:
+            return
+
+        # Only the handful of lanes with a wrapping platform get the sequential pass.
+        # Like FrogSim's lane rings, platforms re-enter leader first, each one a
+        # lane_gap behind the current tail, so lanes stay sorted without a fix-up.
+        shift = self.lane_shift[env, lane][:, None]
+        x = self.plat_base[env, lane] + shift
+        w = self.plat_w[env, lane]
+        valid = self.plat_valid[env, lane]
+        right = right[env, lane]
+        need = valid & np.where(right[:, None], x > WIDTH + WRAP_MARGIN, x + w < -WRAP_MARGIN)
+        lead_first = np.argsort(np.where(valid, np.where(right[:, None], -x, x), _FAR), axis=1)
+        rows = np.arange(env.size)
+        gap = self.lane_gap
+        for i in range(MAX_PLATFORMS_PER_LANE):
+            k = lead_first[:, i]
+            m = need[rows, k]
+            if not m.any():
+                break
+            leftmost = np.where(valid, x, _FAR).min(axis=1)
+            rightmost = np.where(valid, x + w, -_FAR).max(axis=1)
+            behind = np.where(right, leftmost - gap - w[rows, k], rightmost + gap)
+            x[rows, k] = np.where(m, behind, x[rows, k])
+        self.plat_base[env, lane] = x - shift
+        self._refresh_lead(env, lane)
+
+    def _update_flies(self) -> None:
+        ax, ay, aw, ah = self.fly_area
+        self.fly_pos += self.fly_vel
+        px = self.fly_pos[:, :, 0]
+        py = self.fly_pos[:, :, 1]
+        flip_x = (px < ax + FLY_R) | (px > ax + aw - FLY_R)
+        flip_y = (py < ay + FLY_R) | (py > ay + ah - FLY_R)
+        self.fly_vel[:, :, 0] = np.where(flip_x, -self.fly_vel[:, :, 0], self.fly_vel[:, :, 0])
+        self.fly_vel[:, :, 1] = np.where(flip_y, -self.fly_vel[:, :, 1], self.fly_vel[:, :, 1])
+
+    def _respawn_flies(self, env: np.ndarray, slot: np.ndarray) -> None:
+        ax, ay, aw, ah = self.fly_area
+        k = env.size
+        self.fly_pos[env, slot, 0] = self.rng.uniform(ax + 10, ax + aw - 10, k)
+        self.fly_pos[env, slot, 1] = self.rng.uniform(ay + 10, ay + ah - 10, k)
+        angle = self.rng.uniform(0, 6.283, k)
+        speed = 1.0 + 0.25 * (self.level[env] - 1)
+        self.fly_vel[env, slot, 0] = speed * np.cos(angle)
+        self.fly_vel[env, slot, 1] = speed * np.sin(angle)
+
+    def _resolve_frog(self, rebuild: np.ndarray, level_up: np.ndarray) -> None:
+        everyone = np.arange(self.n)
+
+        # If frog is in water, it must be on a moving log/lilypad and gets carried by it
+        wet = everyone[self._in_water(everyone)]
+        found, lane, slot = self._support(wet)
+        self._kill(wet[~found], rebuild)
+        riding = wet[found]
+        self.fx[riding] += self.lane_dx[riding, lane[found]]
+
+        # Lose a life if carried completely off-screen by a log/lilypad.
+        fl, _, fr, _ = self._frog_rect(riding)
+        off = (fr < 0) | (fl > WIDTH)
+        self._kill(riding[off], rebuild)
+        riding = riding[~off]
+
+        # Allow sideways movement while riding.
+        left = self.left_held[riding]
+        right = self.right_held[riding]
+        self.last_dir[riding[left]] = -1
+        self.last_dir[riding[right]] = 1
+        walk = np.where(left, -WALK_SPEED, 0.0) + np.where(right, WALK_SPEED, 0.0)
+        walking = riding[walk != 0.0]
+        self.fx[walking] += walk[walk != 0.0]
+        fl, _, fr, _ = self._frog_rect(walking)
+        self._kill(walking[(fr < 0) | (fl > WIDTH)], rebuild)
+
+        # Crocs and flies never leave the water band, so only frogs overlapping it
+        # vertically need the per-entity checks.
+        _, wy, _, wh = self.water
+        _, ft, _, fb = self._frog_rect(everyone)
+        near = everyone[(ft < wy + wh) & (fb > wy)]
+
+        # Crocodile hazard
+        fl, ft, fr, fb = self._frog_rect(near)
+        croc_top = self.lane_top[near] + self.lane_h[near] // 2 - CROC_H // 2
+        lanes, oh = self._candidate_lanes(near, croc_top, np.full_like(croc_top, CROC_H), ft, fb)
+        row = self._lane_rows(near, lanes)
+        plat_x = self._rows(self.plat_base)[row] + self.lane_shift.reshape(-1)[row][:, :, None]
+        cl = plat_x + self._rows(self.plat_w)[row] // 2 + self._rows(self.croc_offset)[row] - CROC_W // 2
+        ow = np.minimum(fr[:, None, None], cl + CROC_W) - np.maximum(fl[:, None, None], cl)
+        hit = self._rows(self.croc)[row] & (ow > 0) & (oh[:, :, None] > 0)
+        self._kill(near[hit.any(axis=(1, 2))], rebuild)
+
+        # Eat flies
+        fl, ft, fr, fb = self._frog_rect(near)
+        fly_l = np.trunc(self.fly_pos[near, :, 0] - FLY_R).astype(np.int64)
+        fly_t = np.trunc(self.fly_pos[near, :, 1] - FLY_R).astype(np.int64)
+        eaten = (
+            self.fly_valid[near]
+            & (fly_l < fr[:, None]) & (fly_l + 2 * FLY_R > fl[:, None])
+            & (fly_t < fb[:, None]) & (fly_t + 2 * FLY_R > ft[:, None])
+        )
+        rows, slot = np.nonzero(eaten)
+        if rows.size:
+            env = near[rows]
+            np.add.at(self.score, env, 100)
+            np.add.at(self.flies_eaten, env, 1)
+            self._respawn_flies(env, slot)
+
+        # Win condition: reach the other side (top safe bank)
+        fl, ft, fr, fb = self._frog_rect(everyone)
+        sx, sy, sw, sh = self.safe_top
+        won = (fl < sx + sw) & (fr > sx) & (ft < sy + sh) & (fb > sy)
+        level_up |= won
+        self.level[won] += 1
+        rebuild |= won
+
+    def step(self, actions: np.ndarray) -> BatchStepResult:
+        actions = np.asarray(actions)
+        deaths_before = self.deaths.copy()
+        eaten_before = self.flies_eaten.copy()
+        rebuild = np.zeros(self.n, dtype=bool)
+        level_up = np.zeros(self.n, dtype=bool)
+
+        # Each env presses at most one button per step, so the groups don't interact.
+        self._attempt_hop(np.flatnonzero(actions == ACTION_UP), 0, -STEP_Y)
+        self._attempt_hop(np.flatnonzero(actions == ACTION_DOWN), 0, STEP_Y)
+        self._press_side(np.flatnonzero(actions == ACTION_LEFT), -1)
+        self._press_side(np.flatnonzero(actions == ACTION_RIGHT), 1)
+        jump = np.flatnonzero(actions == ACTION_JUMP)
+        self._attempt_hop(jump, self.last_dir[jump] * STEP_X, 0)
+        np.equal(actions, ACTION_LEFT, out=self.left_held)
+        np.equal(actions, ACTION_RIGHT, out=self.right_held)
+
+        np.subtract(self.cooldown, self.cooldown > 0, out=self.cooldown)
+        self._update_lanes()
+        self._update_flies()
+        self._resolve_frog(rebuild, level_up)
+
+        for e in np.flatnonzero(rebuild):
+            self._load_level(e, int(self.level[e]))
+
+        return BatchStepResult(
+            deaths=self.deaths - deaths_before,
+            flies_eaten=self.flies_eaten - eaten_before,
+            level_complete=level_up,
+        )
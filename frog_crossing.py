@@ -1,18 +1,78 @@
+import argparse
+import os
 import sys
 import random
+from bisect import bisect_right
+from collections import OrderedDict, deque
 from dataclasses import dataclass
+from functools import partial
+from typing import Callable
 from pathlib import Path
+from array import array
+import csv
+import json
 import math
 import asyncio
+import time
 import traceback
+import zlib
 
 import pygame
 
 
 WIDTH, HEIGHT = 900, 640
-FPS = 60
+FPS = 60  # render cap
+# The simulation advances in fixed SIM_HZ steps regardless of render rate: slow devices
+# run several steps per rendered frame (at most MAX_SIM_STEPS_PER_FRAME, then the
+# backlog is dropped), fast ones draw between steps. Entities are drawn interpolated
+# between their last two simulated positions, except for moves longer than
+# INTERP_MAX_DISTANCE px (hops, wraps, respawns), which snap.
+SIM_HZ = 60
+MAX_SIM_STEPS_PER_FRAME = 5
+INTERP_MAX_DISTANCE = 24
+
+# Frame pacing. Rendering drops to IDLE_FPS once the frog has sat on a bank with no
+# input for IDLE_AFTER_SECONDS (nothing near it can move it or kill it), while the
+# window is unfocused, and while a frame's measured work doesn't fit in an FPS frame
+# (back up once it is under SLOW_RECOVER of one). While the window is hidden or
+# minimized the game pauses and only polls events at BACKGROUND_FPS.
+IDLE_FPS = 30
+IDLE_AFTER_SECONDS = 3.0
+BACKGROUND_FPS = 4
+SLOW_RECOVER = 0.75
+
+# Per-phase frame timing. F3 toggles the overlay (and recording) at runtime; setting
+# FROG_PROFILE=1 records from the start, FROG_PROFILE=<file.json|file.csv> also picks
+# the report written on exit (web builds print it to the console instead).
+# "bookkeeping" is the per-step work around the rules: queued presses, interpolation
+# snapshots and input recording.
+PROFILE_PHASES = (
+    "events", "bookkeeping", "frog", "lanes", "crocs_flies", "collide", "background", "entities", "hud", "flip",
+)
+PROFILE_WINDOW = 600  # frames kept for the rolling percentiles
+PROFILE_DEFAULT_OUT = "frog_profile.json"
 HUD_H = 44
 
+# FrogSim(require_solvable=True) regenerates a level up to this many times until the
+# planner finds a crossing, then keeps the last one.
+SOLVABLE_BUILD_ATTEMPTS = 8
+
+# Cell size (px) of the SpatialHash grids FrogSim keeps for crocs and flies. A frog-sized
+# query touches at most four cells, and entities moving a few px per frame only change
+# cells now and then (relinking is most of the grid's upkeep).
+SPATIAL_CELL = 128
+
+# Startup is staged so a web build shows a loading screen at once instead of a blank
+# page: __init__ only opens the window and draws that screen, then each sprite in
+# SPRITE_NAMES, the first level and a sprite cache warm-up run one per frame (yielding
+# to the browser in between) while a progress bar fills. The times to the first frame
+# and to the first playable frame are printed when loading finishes.
+SPRITE_NAMES = ("frog", "croc", "fly", "log", "lilypad")
+
+# Sprite atlas index written by tools/build_atlas.py, loaded (when present) before the
+# individual PNGs.
+SPRITE_ATLAS_INDEX = "atlas.json"
+
 # Touch controls (shown on web/mobile)
 TOUCH_UI = True
 
@@ -25,6 +85,31 @@ WALK_SPEED = 3.2
 # and avoids white halos when keying out flat backgrounds.
 PIXEL_ART_SPRITES = True
 
+# Push only the parts of the screen that changed (pygame.display.update(rects))
+# instead of flipping the whole window every frame. A frame falls back to a full
+# redraw + flip after a level change, when more than DIRTY_FULL_REDRAW_FRACTION
+# of the screen was dirty anyway, or for good if partial updates fail.
+DIRTY_RECTS = True
+DIRTY_FULL_REDRAW_FRACTION = 0.6
+
+# Upper bound on pixel data held by SpriteBank's scaled/rotated sprite cache. Each level
+# brings new platform widths, so without a cap the cache grows for the whole session.
+SPRITE_CACHE_BYTES = 16 * 1024 * 1024
+
+# Platform widths are random at 1 px resolution, so scaling a sprite per width means
+# a fresh transform for nearly every platform on every level build. Logs are instead
+# drawn three-slice: end caps and a tiled middle, cut from the base sprite once per
+# height (LOG_CAP_FRACTIONS of the base width are the caps). Lilypads can't be
+# sliced, so their sprite width snaps to the nearest multiple of LILYPAD_WIDTH_STEP
+# and is centered in the hitbox (each edge within 2 px of the hitbox's).
+LOG_CAP_FRACTIONS = (0.25, 1 / 6)
+LILYPAD_WIDTH_STEP = 8
+
+# Pre-render every rotation bucket of the fly sprite into one sheet when a level is
+# built, instead of rotating lazily the first time a fly turns to a new heading
+# (which hitches on web). Off by default; draws are pixel-identical either way.
+ROTATION_ATLAS = False
+
 # Sprite-only scale factors
 # Croc: wider and taller than its hitbox for a more dramatic sprite.
 CROC_SPRITE_SCALE_X = 3
@@ -37,6 +122,7 @@ FROG_SPRITE_SCALE_Y = 2
 # Fly: make sprite larger without changing hitbox.
 FLY_SPRITE_SCALE_X = 4
 FLY_SPRITE_SCALE_Y = 4
+FLY_ANGLE_STEP = 10
 
 # Colors
 WATER = (50, 110, 180)
@@ -51,11 +137,23 @@ TEXT = (10, 10, 10)
 
 
 class SpriteBank:
-    def __init__(self, assets_dir: Path):
+    def __init__(self, assets_dir: Path, budget_bytes: int = SPRITE_CACHE_BYTES):
         self.assets_dir = assets_dir
         self._base: dict[str, pygame.Surface] = {}
-        self._scaled: dict[tuple[str, int, int], pygame.Surface] = {}
-        self._rotated: dict[tuple[str, int, int, int], pygame.Surface] = {}
+        # Scaled and rotated surfaces share one LRU, bounded by budget_bytes of pixel data.
+        # Keys are (name, w, h) for scaled and (name, w, h, angle) for rotated sprites.
+        self._cache: OrderedDict[tuple, pygame.Surface] = OrderedDict()
+        self.budget_bytes = budget_bytes
+        self.cache_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        # (name, w, h, angle_step) -> (sheet, {bucket: area}); see build_rotation_atlas.
+        self._atlases: dict[tuple[str, int, int, int], tuple[pygame.Surface, dict[int, pygame.Rect]]] = {}
+        # (name, w, h) -> pre-scaled frame from the sprite atlas; see load_atlas.
+        self._frames: dict[tuple[str, int, int], pygame.Surface] = {}
+        # (name, h, caps) -> (strip width, left cap, right cap); see blit_sliced.
+        self._slices: dict[tuple, tuple[int, int, int]] = {}
 
     def _load_png(self, name: str) -> pygame.Surface | None:
         path = self.assets_dir / f"{name}.png"
@@ -63,25 +161,36 @@ class SpriteBank:
             return None
         try:
             img = pygame.image.load(str(path)).convert_alpha()
-
-            # If the sprite was saved without transparency (common "white box"),
-            # try to auto-key out a flat background color.
-            # Heuristic: if all 4 corners match and alpha is fully opaque, use that as colorkey.
-            w, h = img.get_width(), img.get_height()
-            if w >= 2 and h >= 2:
-                c1 = img.get_at((0, 0))
-                c2 = img.get_at((w - 1, 0))
-                c3 = img.get_at((0, h - 1))
-                c4 = img.get_at((w - 1, h - 1))
-                if c1 == c2 == c3 == c4:
-                    r, g, b, a = c1
-                    if a == 255:
-                        img.set_colorkey((r, g, b))
-
+            _corner_colorkey(img)
             return img
         except pygame.error:
             return None
 
+    def load_atlas(self) -> bool:
+        # The tools/build_atlas.py output: every sprite already keyed and scaled to the
+        # sizes it is drawn at, packed into one image. Sprites whose source PNG changed
+        # since the build are left out and load from the PNG as usual.
+        index_path = self.assets_dir / SPRITE_ATLAS_INDEX
+        if not index_path.exists():
+            return False
+        try:
+            index = json.loads(index_path.read_text())
+            sheet = pygame.image.load(str(self.assets_dir / index["image"])).convert_alpha()
+        except (OSError, ValueError, KeyError, pygame.error):
+            return False
+        for name, entry in index["sprites"].items():
+            source = self.assets_dir / f"{name}.png"
+            # Web bundles ship the atlas without the full-size sources.
+            if source.exists() and zlib.crc32(source.read_bytes()) != entry["crc32"]:
+                print(f"[frog] {name}.png changed since the atlas was built, loading it directly")
+                continue
+            frames = [sheet.subsurface(area) for area in entry["frames"]]
+            for frame in frames:
+                self._frames[(name, frame.get_width(), frame.get_height())] = frame
+            # The largest frame stands in for the source if another size is asked for.
+            self._base.setdefault(name, max(frames, key=lambda f: f.get_width() * f.get_height()))
+        return True
+
     def _make_placeholder(self, name: str) -> pygame.Surface:
         # Small base sprites; scaled + cached per needed size.
         if name == "frog":
@@ -159,19 +268,57 @@ class SpriteBank:
             self._base[name] = img if img is not None else self._make_placeholder(name)
         return self._base[name]
 
+    def _lookup(self, key: tuple, count: bool = True) -> pygame.Surface | None:
+        # count=False for surfaces fetched on the way to building another, so each
+        # get*() call is one hit or one miss in stats().
+        surf = self._cache.get(key)
+        if surf is None:
+            if count:
+                self.misses += 1
+            return None
+        if count:
+            self.hits += 1
+        self._cache.move_to_end(key)
+        return surf
+
+    def _store(self, key: tuple, surf: pygame.Surface) -> None:
+        self._cache[key] = surf
+        self.cache_bytes += _surface_bytes(surf)
+        # Evict least recently used, but never the surface we are about to hand out.
+        while self.cache_bytes > self.budget_bytes and len(self._cache) > 1:
+            _, old = self._cache.popitem(last=False)
+            self.cache_bytes -= _surface_bytes(old)
+            self.evictions += 1
+
+    def stats(self) -> dict[str, int]:
+        return {
+            "entries": len(self._cache),
+            "bytes": self.cache_bytes,
+            "budget_bytes": self.budget_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
+
     def get(self, name: str, size: tuple[int, int]) -> pygame.Surface:
+        return self._scaled(name, size, True)
+
+    def _scaled(self, name: str, size: tuple[int, int], count: bool) -> pygame.Surface:
         w, h = size
         w = max(1, int(w))
         h = max(1, int(h))
         key = (name, w, h)
-        if key in self._scaled:
-            return self._scaled[key]
-        img = self.base(name)
-        if PIXEL_ART_SPRITES:
-            scaled = pygame.transform.scale(img, (w, h))
-        else:
-            scaled = pygame.transform.smoothscale(img, (w, h))
-        self._scaled[key] = scaled
+        scaled = self._lookup(key, count)
+        if scaled is not None:
+            return scaled
+        scaled = self._frames.get(key)
+        if scaled is None:
+            img = self.base(name)
+            if PIXEL_ART_SPRITES:
+                scaled = pygame.transform.scale(img, (w, h))
+            else:
+                scaled = pygame.transform.smoothscale(img, (w, h))
+        self._store(key, scaled)
         return scaled
 
     def get_rotated(self, name: str, size: tuple[int, int], angle_degrees: float, angle_step: int = 5) -> pygame.Surface:
@@ -182,14 +329,188 @@ class SpriteBank:
         bucket = int(round(angle_degrees / angle_step)) * angle_step
         bucket %= 360
         key = (name, w, h, bucket)
-        if key in self._rotated:
-            return self._rotated[key]
+        rotated = self._lookup(key)
+        if rotated is not None:
+            return rotated
 
-        base = self.get(name, (w, h))
+        base = self._scaled(name, (w, h), False)
         rotated = pygame.transform.rotate(base, bucket)
-        self._rotated[key] = rotated
+        self._store(key, rotated)
         return rotated
 
+    def blit_sliced(
+        self, surf: pygame.Surface, name: str, pos: tuple[int, int], size: tuple[int, int], caps: tuple[float, float]
+    ) -> pygame.Rect:
+        # Three-slice: the base keeps its aspect ratio at height h, the end caps are
+        # copied as-is and the middle section is tiled to fill the width. Only the
+        # per-height strip is cached; the pieces go straight onto surf, so no
+        # surface is kept per width.
+        w, h = max(1, int(size[0])), max(1, int(size[1]))
+        x, y = pos
+        key = (name, h, caps)
+        geometry = self._slices.get(key)
+        if geometry is None:
+            base = self.base(name)
+            scaled_w = max(3, round(base.get_width() * h / base.get_height()))
+            geometry = (scaled_w, max(1, int(scaled_w * caps[0])), max(1, int(scaled_w * caps[1])))
+            self._slices[key] = geometry
+        scaled_w, left, right = geometry
+        mid = scaled_w - left - right
+        if w < left + right or mid <= 0:
+            # Too narrow to slice: a plain scale.
+            return surf.blit(self.get(name, (w, h)), (x, y))
+
+        strip = self.get(name, (scaled_w, h))
+        end = x + w - right
+        pieces = [(strip, (x, y), (0, 0, left, h)), (strip, (end, y), (scaled_w - right, 0, right, h))]
+        tx = x + left
+        while tx < end:
+            pieces.append((strip, (tx, y), (left, 0, min(mid, end - tx), h)))
+            tx += mid
+        surf.blits(pieces, False)
+        return pygame.Rect(x, y, w, h).clip(surf.get_clip())
+
+    def build_rotation_atlas(self, name: str, size: tuple[int, int], angle_step: int) -> None:
+        # Render all 360 / angle_step buckets into a square grid of cells on one sheet.
+        # Each frame keeps its own rotated size, so a sub-rect blit matches get_rotated.
+        w, h = max(1, int(size[0])), max(1, int(size[1]))
+        key = (name, w, h, angle_step)
+        if key in self._atlases:
+            return
+        base = self._scaled(name, (w, h), False)
+        frames = [(b, pygame.transform.rotate(base, b)) for b in range(0, 360, angle_step)]
+        cell = max(max(img.get_width(), img.get_height()) for _, img in frames)
+        cols = math.ceil(math.sqrt(len(frames)))
+        rows = math.ceil(len(frames) / cols)
+        sheet = pygame.Surface((cols * cell, rows * cell), pygame.SRCALPHA)
+        areas: dict[int, pygame.Rect] = {}
+        for i, (bucket, img) in enumerate(frames):
+            row, col = divmod(i, cols)
+            area = img.get_rect(topleft=(col * cell, row * cell))
+            sheet.blit(img, area)
+            areas[bucket] = area
+        self._atlases[key] = (sheet, areas)
+
+    def draw_rotated(
+        self,
+        surf: pygame.Surface,
+        name: str,
+        size: tuple[int, int],
+        angle_degrees: float,
+        center: tuple[int, int],
+        angle_step: int = 5,
+    ) -> pygame.Rect:
+        w, h = max(1, int(size[0])), max(1, int(size[1]))
+        atlas = self._atlases.get((name, w, h, angle_step))
+        if atlas is None:
+            img = self.get_rotated(name, (w, h), angle_degrees, angle_step)
+            return surf.blit(img, img.get_rect(center=center))
+        sheet, areas = atlas
+        bucket = int(round(angle_degrees / angle_step)) * angle_step % 360
+        area = areas[bucket]
+        dst = area.copy()
+        dst.center = center
+        return surf.blit(sheet, dst, area)
+
+
+def _corner_colorkey(img: pygame.Surface) -> None:
+    # If the sprite was saved without transparency (common "white box"),
+    # try to auto-key out a flat background color.
+    # Heuristic: if all 4 corners match and alpha is fully opaque, use that as colorkey.
+    w, h = img.get_width(), img.get_height()
+    if w >= 2 and h >= 2:
+        c1 = img.get_at((0, 0))
+        c2 = img.get_at((w - 1, 0))
+        c3 = img.get_at((0, h - 1))
+        c4 = img.get_at((w - 1, h - 1))
+        if c1 == c2 == c3 == c4:
+            r, g, b, a = c1
+            if a == 255:
+                img.set_colorkey((r, g, b))
+
+
+def _surface_bytes(surf: pygame.Surface) -> int:
+    # Subsurfaces (atlas frames) share their sheet's pixels, which stay loaded anyway.
+    if surf.get_parent() is not None:
+        return 0
+    return surf.get_width() * surf.get_height() * surf.get_bytesize()
+
+
+class FrameProfiler:
+    # Accumulates wall time per phase within a frame: start() marks the beginning,
+    # each lap(phase) charges the time since the previous mark to that phase, and
+    # end_frame() pushes the frame's totals (ms) into rolling windows. Every call
+    # returns straight away while disabled, so it can stay wired in everywhere.
+    def __init__(self, enabled: bool = False, window: int = PROFILE_WINDOW) -> None:
+        self.enabled = enabled
+        self.frames = 0
+        self._samples: dict[str, deque[float]] = {p: deque(maxlen=window) for p in PROFILE_PHASES}
+        self._totals: deque[float] = deque(maxlen=window)
+        self._current: dict[str, float] = dict.fromkeys(PROFILE_PHASES, 0.0)
+        self._start = 0.0
+        self._mark = 0.0
+
+    def start(self) -> None:
+        if not self.enabled:
+            return
+        current = self._current
+        for phase in current:
+            current[phase] = 0.0
+        self._start = self._mark = time.perf_counter()
+
+    def lap(self, phase: str) -> None:
+        if not self.enabled:
+            return
+        now = time.perf_counter()
+        self._current[phase] += now - self._mark
+        self._mark = now
+
+    def end_frame(self) -> None:
+        if not self.enabled:
+            return
+        current = self._current
+        for phase, seconds in current.items():
+            self._samples[phase].append(seconds * 1000.0)
+            current[phase] = 0.0
+        self._totals.append((time.perf_counter() - self._start) * 1000.0)
+        self.frames += 1
+
+    def percentiles(self) -> dict[str, tuple[float, float, float]]:
+        # phase -> (p50, p95, p99) in ms over the rolling window, plus "total".
+        out = {}
+        for phase, samples in [*self._samples.items(), ("total", self._totals)]:
+            if not samples:
+                continue
+            ordered = sorted(samples)
+            last = len(ordered) - 1
+            out[phase] = tuple(ordered[round(q * last)] for q in (0.50, 0.95, 0.99))
+        return out
+
+    def report(self) -> dict:
+        return {
+            "frames": self.frames,
+            "window": len(self._totals),
+            "phases_ms": {
+                phase: {"p50": p50, "p95": p95, "p99": p99}
+                for phase, (p50, p95, p99) in self.percentiles().items()
+            },
+        }
+
+    def dump(self, path: str) -> None:
+        if path.endswith(".csv"):
+            with open(path, "w", newline="") as fh:
+                writer = csv.writer(fh)
+                writer.writerow(["phase", "p50_ms", "p95_ms", "p99_ms"])
+                for phase, values in self.percentiles().items():
+                    writer.writerow([phase, *(f"{v:.4f}" for v in values)])
+        else:
+            with open(path, "w") as fh:
+                json.dump(self.report(), fh, indent=2)
+
+
+# Shared do-nothing profiler for sims nobody is timing.
+NULL_PROFILER = FrameProfiler(enabled=False)
+
 
 @dataclass
 class LevelTuning:
@@ -217,8 +538,10 @@ def tuning_for_level(level: int) -> LevelTuning:
 
 
 class Frog:
+    __slots__ = ("rect", "pos", "_move_cooldown")
+    w, h = 34, 28
+
     def __init__(self, start_pos: pygame.Vector2):
-        self.w, self.h = 34, 28
         self.rect = pygame.Rect(0, 0, self.w, self.h)
         self.pos = pygame.Vector2(start_pos)
         self.rect.center = (int(self.pos.x), int(self.pos.y))
@@ -242,48 +565,64 @@ class Frog:
         self.rect.center = (int(self.pos.x), int(self.pos.y))
         self._move_cooldown = 6
 
-    def draw(self, surf: pygame.Surface, sprites: SpriteBank) -> None:
+    def draw(self, surf: pygame.Surface, sprites: SpriteBank, offset: tuple[int, int] = (0, 0)) -> pygame.Rect:
         sw = self.rect.width * FROG_SPRITE_SCALE_X
         sh = self.rect.height * FROG_SPRITE_SCALE_Y
         img = sprites.get("frog", (sw, sh))
-        dst = img.get_rect(center=self.rect.center)
-        surf.blit(img, dst)
+        dst = img.get_rect(center=(self.rect.centerx + offset[0], self.rect.centery + offset[1]))
+        return surf.blit(img, dst)
 
 
 class Platform:
+    __slots__ = ("kind", "lane_id", "rect", "speed", "dx_last", "order")
+
     def __init__(self, lane_id: int, lane_y: int, x: float, w: int, h: int, speed: float, kind: str):
+        self.rect = pygame.Rect(0, 0, 0, 0)
+        self.reset(lane_id, lane_y, x, w, h, speed, kind)
+
+    def reset(self, lane_id: int, lane_y: int, x: float, w: int, h: int, speed: float, kind: str) -> None:
+        # Reinitialize in place; FrogSim pools platforms across level builds.
         self.kind = kind  # 'log' or 'lilypad'
         self.lane_id = lane_id
-        self.rect = pygame.Rect(int(x), int(lane_y - h // 2), w, h)
+        self.rect.update(int(x), int(lane_y - h // 2), w, h)
         self.speed = speed
         self.dx_last = 0
+        # Position in FrogSim.platforms; breaks support ties the way a linear scan would.
+        self.order = 0
 
     def update(self) -> None:
         # Keep movement pixel-consistent so riders don't slowly drift due to rounding.
         self.dx_last = int(self.speed)
         self.rect.x += self.dx_last
 
-    def needs_wrap(self) -> bool:
+    def needs_wrap(self, width: int = WIDTH) -> bool:
         if self.speed > 0:
-            return self.rect.left > WIDTH + 60
+            return self.rect.left > width + 60
         return self.rect.right < -60
 
-    def draw(self, surf: pygame.Surface, sprites: SpriteBank) -> None:
+    def draw(self, surf: pygame.Surface, sprites: SpriteBank, offset: tuple[int, int] = (0, 0)) -> pygame.Rect:
+        x = self.rect.x + offset[0]
+        y = self.rect.y + offset[1]
         if self.kind == "log":
-            img = sprites.get("log", (self.rect.width, self.rect.height))
-            surf.blit(img, self.rect)
+            return sprites.blit_sliced(surf, "log", (x, y), self.rect.size, LOG_CAP_FRACTIONS)
         else:
-            img = sprites.get("lilypad", (self.rect.width, self.rect.height))
-            surf.blit(img, self.rect)
+            w = max(LILYPAD_WIDTH_STEP, round(self.rect.width / LILYPAD_WIDTH_STEP) * LILYPAD_WIDTH_STEP)
+            img = sprites.get("lilypad", (w, self.rect.height))
+            return surf.blit(img, (x + (self.rect.width - w) // 2, y))
 
 
 class Crocodile:
+    __slots__ = ("platform", "offset_x", "rect")
+    w, h = 46, 18
+
     def __init__(self, platform: Platform):
+        self.rect = pygame.Rect(0, 0, self.w, self.h)
+        self.reset(platform)
+
+    def reset(self, platform: Platform) -> None:
         # Croc rides on a platform, offset a bit
         self.platform = platform
-        self.w, self.h = 46, 18
         self.offset_x = 0
-        self.rect = pygame.Rect(0, 0, self.w, self.h)
         self._sync()
 
     def _sync(self) -> None:
@@ -296,140 +635,494 @@ class Crocodile:
     def update(self) -> None:
         self._sync()
 
-    def draw(self, surf: pygame.Surface, sprites: SpriteBank) -> None:
+    def draw(self, surf: pygame.Surface, sprites: SpriteBank, offset: tuple[int, int] = (0, 0)) -> pygame.Rect:
         sw = self.rect.width * CROC_SPRITE_SCALE_X
         sh = self.rect.height * CROC_SPRITE_SCALE_Y
         img = sprites.get("croc", (sw, sh))
-        dst = img.get_rect(center=self.rect.center)
-        surf.blit(img, dst)
+        dst = img.get_rect(center=(self.rect.centerx + offset[0], self.rect.centery + offset[1]))
+        return surf.blit(img, dst)
+
+
+_UP = pygame.Vector2(0, -1)
 
 
 class Fly:
-    def __init__(self, area: pygame.Rect, speed: float):
+    __slots__ = ("area", "pos", "vel", "facing_deg", "rect", "spawns", "_min_x", "_max_x", "_min_y", "_max_y")
+    r = 6
+
+    def __init__(self, area: pygame.Rect, speed: float, rng: random.Random):
         self.area = area
-        self.pos = pygame.Vector2(
-            random.uniform(area.left + 10, area.right - 10),
-            random.uniform(area.top + 10, area.bottom - 10),
+        # Bounce limits for the center.
+        r = self.r
+        self._min_x = area.left + r
+        self._max_x = area.right - r
+        self._min_y = area.top + r
+        self._max_y = area.bottom - r
+        self.pos = pygame.Vector2()
+        self.vel = pygame.Vector2()
+        # Hitbox, kept in step with pos by sync_rect().
+        self.rect = pygame.Rect(0, 0, r * 2, r * 2)
+        # Bumped by respawn(), so renderers can tell a respawn from a move.
+        self.spawns = 0
+        self.respawn(speed, rng)
+
+    def respawn(self, speed: float, rng: random.Random) -> None:
+        # A random spot and heading in the area, reusing this fly's vectors and rect.
+        area = self.area
+        self.pos.update(
+            rng.uniform(area.left + 10, area.right - 10),
+            rng.uniform(area.top + 10, area.bottom - 10),
         )
-        angle = random.uniform(0, 6.283)
-        self.vel = pygame.Vector2(speed, 0).rotate_rad(angle)
-        self.r = 6
+        angle = rng.uniform(0, 6.283)
+        self.vel.update(speed, 0)
+        self.vel.rotate_rad_ip(angle)
         # Sprite faces up by default (eyes at top). Keep last angle if velocity is tiny.
         self.facing_deg = 0.0
+        self.spawns += 1
+        self.sync_rect()
 
-    @property
-    def rect(self) -> pygame.Rect:
-        return pygame.Rect(int(self.pos.x - self.r), int(self.pos.y - self.r), self.r * 2, self.r * 2)
+    def sync_rect(self) -> None:
+        self.rect.topleft = (int(self.pos.x - self.r), int(self.pos.y - self.r))
 
     def update(self) -> None:
-        self.pos += self.vel
+        pos = self.pos
+        pos += self.vel
         # bounce in area
-        if self.pos.x < self.area.left + self.r or self.pos.x > self.area.right - self.r:
+        if pos.x < self._min_x or pos.x > self._max_x:
             self.vel.x *= -1
-        if self.pos.y < self.area.top + self.r or self.pos.y > self.area.bottom - self.r:
+        if pos.y < self._min_y or pos.y > self._max_y:
             self.vel.y *= -1
+        self.sync_rect()
 
         if self.vel.length_squared() > 1e-6:
             # Angle from "up" (0,-1) to current velocity.
-            self.facing_deg = pygame.Vector2(0, -1).angle_to(self.vel)
+            self.facing_deg = _UP.angle_to(self.vel)
 
-    def draw(self, surf: pygame.Surface, sprites: SpriteBank) -> None:
+    def draw(self, surf: pygame.Surface, sprites: SpriteBank, offset: tuple[int, int] = (0, 0)) -> pygame.Rect:
         r = self.r
         sw = r * 2 * FLY_SPRITE_SCALE_X
         sh = r * 2 * FLY_SPRITE_SCALE_Y
-        img = sprites.get_rotated("fly", (sw, sh), self.facing_deg, angle_step=10)
-        dst = img.get_rect(center=(int(self.pos.x), int(self.pos.y)))
-        surf.blit(img, dst)
+        center = (int(self.pos.x) + offset[0], int(self.pos.y) + offset[1])
+        return sprites.draw_rotated(surf, "fly", (sw, sh), self.facing_deg, center, FLY_ANGLE_STEP)
 
 
-class FrogCrossingGame:
-    def __init__(self) -> None:
-        pygame.init()
+@dataclass(frozen=True)
+class StepInput:
+    # Button presses that happened this frame, in order ("up", "down", "left",
+    # "right", "jump"), plus whether left/right are currently held for walking.
+    presses: tuple[str, ...] = ()
+    left_held: bool = False
+    right_held: bool = False
 
-        self.is_web = sys.platform == "emscripten"
-        # On web/mobile, initializing audio can trigger autoplay restrictions and
-        # sometimes results in a "black screen" experience. We don't use audio.
-        if self.is_web:
-            try:
-                pygame.mixer.quit()
-            except Exception:
-                pass
 
-        flags = pygame.RESIZABLE
-        if not self.is_web:
-            flags |= pygame.SCALED
-        try:
-            self.screen = pygame.display.set_mode((WIDTH, HEIGHT), flags)
-        except Exception:
-            self.screen = pygame.display.set_mode((WIDTH, HEIGHT))
-        pygame.display.set_caption("Frog Crossing")
-        self.clock = pygame.time.Clock()
-        self.font = pygame.font.SysFont(None, 28)
-
-        self.sprites = SpriteBank(Path(__file__).parent / "assets")
-
-        self.touch = TouchControls(enabled=TOUCH_UI and self.is_web)
+@dataclass
+class StepResult:
+    score: int
+    level: int
+    lives: int
+    deaths: int
+    flies_eaten: int
+    level_complete: bool
+
+
+@dataclass(frozen=True)
+class SimLayout:
+    # One level's object graph as built by _build_level, frozen into tuples. Shared by
+    # every snapshot taken during that level; the per-step values live in the buffer.
+    platforms: tuple[Platform, ...]
+    crocs: tuple[Crocodile, ...]
+    flies: tuple[Fly, ...]
+    # Platform.reset arguments per platform and Platform.order per croc: FrogSim reuses
+    # these objects for later levels, so restoring this level reinitializes them.
+    platform_specs: tuple[tuple, ...]
+    croc_platforms: tuple[int, ...]
+    lanes: tuple[tuple[int, tuple[Platform, ...]], ...]  # (lane id, ring members)
+    ring_pos: tuple[int, ...]  # Platform.order -> index in its lane's members
+    band_lanes: list[int]
+    band_tops: list[int]
+    band_bottoms: list[int]
+
+
+@dataclass(frozen=True)
+class SimSnapshot:
+    # Two flat buffers, integer state and float state; see FrogSim.snapshot for the order.
+    ints: array
+    floats: array
+    rng_state: tuple
+    layout: SimLayout
+
+
+def _rect_left(p: Platform) -> int:
+    return p.rect.left
+
+
+def _rect_right(p: Platform) -> int:
+    return p.rect.right
+
+
+def _chain_length(plats: list[Platform], gap: int) -> int:
+    # Length of plats laid end to end, gap apart.
+    if not plats:
+        return 0
+    return sum(p.rect.width for p in plats) + gap * (len(plats) - 1)
+
+
+class SpatialHash:
+    # Uniform grid over anything with a fixed-size .rect. Each entity is listed in every
+    # cell its rect touches; move_all() relinks it only when that set of cells changes.
+    __slots__ = ("cell", "_cells", "_spans", "_windows")
+
+    def __init__(self, cell: int = SPATIAL_CELL) -> None:
+        self.cell = cell
+        self._cells: dict[tuple[int, int], list] = {}
+        # entity -> (x0, y0, x1, y1), the inclusive cell range it is linked into
+        self._spans: dict[object, tuple[int, int, int, int]] = {}
+        # entity -> (min x, max x, min y, max y) of rect.topleft that keeps that range
+        self._windows: dict[object, tuple[int, int, int, int]] = {}
+
+    def _span(self, rect: pygame.Rect) -> tuple[int, int, int, int]:
+        cell = self.cell
+        return rect.left // cell, rect.top // cell, (rect.right - 1) // cell, (rect.bottom - 1) // cell
+
+    def _track(self, obj, span: tuple[int, int, int, int]) -> None:
+        cell = self.cell
+        w, h = obj.rect.size
+        x0, y0, x1, y1 = span
+        self._spans[obj] = span
+        self._windows[obj] = (
+            max(x0 * cell, x1 * cell - w + 1), min(x0 * cell + cell - 1, x1 * cell + cell - w),
+            max(y0 * cell, y1 * cell - h + 1), min(y0 * cell + cell - 1, y1 * cell + cell - h),
+        )
 
-        if self.is_web:
-            print("[frog] web init ok")
+    def _link(self, obj, span: tuple[int, int, int, int], skip: tuple[int, int, int, int] | None = None) -> None:
+        # Add obj to the cells in span, except those also in skip.
+        cells = self._cells
+        x0, y0, x1, y1 = span
+        for cy in range(y0, y1 + 1):
+            for cx in range(x0, x1 + 1):
+                if skip is not None and skip[0] <= cx <= skip[2] and skip[1] <= cy <= skip[3]:
+                    continue
+                bucket = cells.get((cx, cy))
+                if bucket is None:
+                    cells[(cx, cy)] = [obj]
+                else:
+                    bucket.append(obj)
+
+    def _unlink(self, obj, span: tuple[int, int, int, int], keep: tuple[int, int, int, int] | None = None) -> None:
+        # Take obj out of the cells in span, except those also in keep.
+        cells = self._cells
+        x0, y0, x1, y1 = span
+        for cy in range(y0, y1 + 1):
+            for cx in range(x0, x1 + 1):
+                if keep is not None and keep[0] <= cx <= keep[2] and keep[1] <= cy <= keep[3]:
+                    continue
+                bucket = cells[(cx, cy)]
+                bucket.remove(obj)
+                if not bucket:
+                    del cells[(cx, cy)]
+
+    def insert(self, obj) -> None:
+        span = self._span(obj.rect)
+        self._track(obj, span)
+        self._link(obj, span)
+
+    def remove(self, obj) -> None:
+        self._unlink(obj, self._spans.pop(obj))
+        del self._windows[obj]
+
+    def rebuild(self, objs) -> None:
+        self._cells.clear()
+        self._spans.clear()
+        self._windows.clear()
+        for obj in objs:
+            self.insert(obj)
+
+    def _relink(self, obj) -> None:
+        # Entities move a few px at a time, so only cells at the edges change hands.
+        old = self._spans[obj]
+        span = self._span(obj.rect)
+        self._unlink(obj, old, keep=span)
+        self._link(obj, span, skip=old)
+        self._track(obj, span)
+
+    def move(self, obj) -> None:
+        r = obj.rect
+        x_min, x_max, y_min, y_max = self._windows[obj]
+        if not (x_min <= r.x <= x_max and y_min <= r.y <= y_max):
+            self._relink(obj)
+
+    def move_all(self, objs) -> None:
+        # move() for each of objs, inlined: this runs every step.
+        windows = self._windows
+        for obj in objs:
+            r = obj.rect
+            x_min, x_max, y_min, y_max = windows[obj]
+            if not (x_min <= r.x <= x_max and y_min <= r.y <= y_max):
+                self._relink(obj)
+
+    def query(self, rect: pygame.Rect) -> list:
+        # Entities whose rect overlaps rect (as colliderect), each once, in no set order.
+        cells = self._cells
+        found = []
+        x0, y0, x1, y1 = self._span(rect)
+        for cy in range(y0, y1 + 1):
+            for cx in range(x0, x1 + 1):
+                bucket = cells.get((cx, cy))
+                if bucket is not None:
+                    for obj in bucket:
+                        if obj not in found and rect.colliderect(obj.rect):
+                            found.append(obj)
+        return found
+
+
+class LaneTimeline:
+    # One lane's platform motion, worked out from the wrap times instead of stepped.
+    # Between two wraps every platform sits still in lane coordinates (u = x - speed*t),
+    # so each epoch is a sorted list of u intervals. Once every platform has wrapped
+    # once the gaps are all lane_gap and the lane repeats every `period` frames, so
+    # only the frames before `settle + period` are stored. t is frames after creation.
+    __slots__ = ("speed", "settle", "period", "_index", "_times", "_starts", "_ends", "_orders", "_us")
+
+    def __init__(self, ring: deque[Platform], gap: int, width: int = WIDTH) -> None:
+        d = int(ring[0].speed)
+        rightward = ring[0].speed > 0
+        order = [p.order for p in ring]
+        widths = [p.rect.width for p in ring]
+        us = [p.rect.x for p in ring]
+        n = len(order)
+        ring_len = sum(widths) + n * gap
+        self.speed = d
+        self.period = ring_len // math.gcd(ring_len, d) if d else 1
+        self._index = {k: i for i, k in enumerate(order)}
+        self._times: list[int] = []
+        self._starts: list[list[int]] = []
+        self._ends: list[list[int]] = []
+        self._orders: list[list[int]] = []
+        self._us: list[list[int]] = []  # u per platform, in the lane's original ring order
+        width_of = dict(zip(order, widths))
+        self._record(0, order, us, width_of)
+
+        settle = 0 if d == 0 else None
+        wraps = 0
+        t = 1  # wraps are checked after each move, so the first can come at t=1
+        while d:
+            if rightward:
+                t = max(t, (width + 60 - us[-1]) // d + 1)
+            else:
+                t = max(t, (60 + us[0] + widths[0]) // -d + 1)
+            if settle is not None and t >= settle + self.period:
+                break
+            if rightward:
+                # The rightmost re-enters one gap left of the leftmost.
+                order.insert(0, order.pop())
+                widths.insert(0, widths.pop())
+                us.pop()
+                us.insert(0, us[0] - gap - widths[0])
+            else:
+                order.append(order.pop(0))
+                widths.append(widths.pop(0))
+                us.pop(0)
+                us.append(us[-1] + widths[-2] + gap)
+            wraps += 1
+            if wraps == n:
+                settle = t
+            self._record(t, order, us, width_of)
+        self.settle = settle
+
+    def _record(self, t: int, order: list[int], us: list[int], width_of: dict[int, int]) -> None:
+        if self._times and self._times[-1] == t:
+            # Several wraps in one frame: only the last arrangement is ever seen.
+            for seq in (self._times, self._starts, self._ends, self._orders, self._us):
+                seq.pop()
+        by_index = [0] * len(order)
+        for k, u in zip(order, us):
+            by_index[self._index[k]] = u
+        self._times.append(t)
+        self._starts.append(list(us))
+        self._ends.append([u + width_of[k] for k, u in zip(order, us)])
+        self._orders.append(list(order))
+        self._us.append(by_index)
+
+    def _epoch(self, t: int) -> tuple[int, int]:
+        # -> (epoch index, t folded into the stored frames)
+        if t >= self.settle + self.period:
+            t = self.settle + (t - self.settle) % self.period
+        return bisect_right(self._times, t) - 1, t
+
+    def left(self, order: int, t: int) -> int:
+        e, t = self._epoch(t)
+        return self._us[e][self._index[order]] + self.speed * t
+
+    def overlaps(self, left: int, right: int, t: int, vx: int = 0) -> tuple[list[tuple[int, int]], int]:
+        # Platforms overlapping [left, right) at frame t as (order, overlap width), and
+        # for how many frames from t the set of overlapping platforms stays the same
+        # if the span moves vx px per frame.
+        e, t = self._epoch(t)
+        d = self.speed
+        starts = self._starts[e]
+        ends = self._ends[e]
+        orders = self._orders[e]
+        u_left = left - d * t
+        u_right = right - d * t
+        first = j = bisect_right(ends, u_left)
+        hits = []
+        while j < len(starts) and starts[j] < u_right:
+            start = starts[j] if starts[j] > u_left else u_left
+            end = ends[j] if ends[j] < u_right else u_right
+            hits.append((orders[j], end - start))
+            j += 1
+
+        if e + 1 < len(self._times):
+            frames = self._times[e + 1] - t
         else:
-            print("[frog] desktop init ok")
+            frames = self.settle + self.period - t
+        rate = vx - d
+        if rate > 0:
+            if hits:
+                frames = min(frames, -((u_left - ends[first]) // rate))
+            if j < len(starts):
+                frames = min(frames, (starts[j] - u_right) // rate + 1)
+        elif rate < 0:
+            if hits:
+                frames = min(frames, -((starts[j - 1] - u_right) // -rate))
+            if first > 0:
+                frames = min(frames, (u_left - ends[first - 1]) // -rate + 1)
+        return hits, max(1, frames)
+
+
+class LaneTimelines:
+    # Every lane's LaneTimeline plus the lane bands, for support queries at any later
+    # frame without stepping the sim. See FrogSim.lane_timelines().
+    def __init__(self, sim: "FrogSim") -> None:
+        self.frame = sim.frame
+        self.builds = sim.builds
+        self._lane_of: list[LaneTimeline | None] = [None] * len(sim.platforms)
+        self._bands: list[tuple[int, int, LaneTimeline]] = []
+        for lane_id in sim._band_lanes:
+            ring = sim.lanes[lane_id]
+            lane = LaneTimeline(ring, sim.lane_gap, sim.width)
+            for p in ring:
+                self._lane_of[p.order] = lane
+            self._bands.append((ring[0].rect.top, ring[0].rect.bottom, lane))
+
+    def left(self, order: int, t: int) -> int:
+        return self._lane_of[order].left(order, t)
+
+    def support_until(self, x: int, y: int, t: int, vx: int = 0) -> tuple[int, int]:
+        # The platform that would hold up a frog centered at (x, y) at frame t, same
+        # choice as FrogSim._frog_on_platform (-1 for none), and for how many frames
+        # that answer holds if the frog moves vx px per frame.
+        f_left = x - Frog.w // 2
+        f_right = f_left + Frog.w
+        f_top = y - Frog.h // 2
+        f_bottom = f_top + Frog.h
+        best = -1
+        best_area = 0
+        found = 0
+        frames = None
+        for top, bottom, lane in self._bands:
+            if bottom <= f_top:
+                continue
+            if top >= f_bottom:
+                break
+            h = min(bottom, f_bottom) - max(top, f_top)
+            hits, lane_frames = lane.overlaps(f_left, f_right, t, vx)
+            frames = lane_frames if frames is None else min(frames, lane_frames)
+            for order, w in hits:
+                found += 1
+                area = w * h
+                if area > best_area or (area == best_area and order < best):
+                    best_area = area
+                    best = order
+        if frames is None:
+            return -1, 1 << 30
+        if found > 1:
+            frames = 1  # overlap areas may shift every frame
+        return best, frames
+
+    def support(self, x: int, y: int, t: int) -> int:
+        return self.support_until(x, y, t)[0]
+
+
+class FrogSim:
+    # All game rules, with no window, font, clock or sprites involved.
+    # The desktop and web loops feed it one StepInput per frame and draw whatever it holds.
+    def __init__(
+        self,
+        level: int = 1,
+        seed: int | None = None,
+        profiler: FrameProfiler | None = None,
+        require_solvable: bool = False,
+        width: int = WIDTH,
+        height: int = HEIGHT,
+        tuning: LevelTuning | None = None,
+    ) -> None:
+        # Phase timing hook for step(); the null default makes each lap a no-op.
+        self.profiler = profiler if profiler is not None else NULL_PROFILER
+        # Every random draw (level layout, fly spawns) goes through this RNG, so a
+        # seed reproduces a whole session.
+        self.rng = random.Random(seed)
 
         self.score = 0
-        self.level = 1
+        self.level = level
         self.max_lives = 3
         self.lives = self.max_lives
 
-        self.safe_top = pygame.Rect(0, HUD_H, WIDTH, STEP_Y)
-        self.safe_bottom = pygame.Rect(0, HEIGHT - STEP_Y, WIDTH, STEP_Y)
-        self.water_area = pygame.Rect(0, HUD_H + STEP_Y, WIDTH, HEIGHT - (HUD_H + 2 * STEP_Y))
-
-        self.start_pos = pygame.Vector2(WIDTH // 2, self.safe_bottom.centery)
+        # Logical screen size. Only the stress mode (frog_stress.py) plays on anything
+        # other than WIDTH x HEIGHT; the game window and the batch/env wrappers don't.
+        self.width = width
+        self.height = height
+        # Overrides tuning_for_level for every level when set.
+        self.tuning = tuning
+        self.safe_top = pygame.Rect(0, HUD_H, width, STEP_Y)
+        self.safe_bottom = pygame.Rect(0, height - STEP_Y, width, STEP_Y)
+        self.water_area = pygame.Rect(0, HUD_H + STEP_Y, width, height - (HUD_H + 2 * STEP_Y))
+
+        self.start_pos = pygame.Vector2(width // 2, self.safe_bottom.centery)
         self.frog = Frog(self.start_pos)
+        self._fly_area = self.water_area.inflate(-20, -20)
 
         self.platforms: list[Platform] = []
-        self.lanes: dict[int, list[Platform]] = {}
+        # Each lane is a ring kept in x order (see _update_lanes).
+        self.lanes: dict[int, deque[Platform]] = {}
+        # Support lookup index: lane y-bands sorted top to bottom.
+        self._band_tops: list[int] = []
+        self._band_bottoms: list[int] = []
+        self._band_lanes: list[int] = []
         self.crocs: list[Crocodile] = []
         self.flies: list[Fly] = []
+        # Croc and fly collision queries go through these; kept in step by step() and
+        # rebuilt with the level or on restore(). Platforms don't need one: the lane
+        # rings are already sorted, see _frog_on_platform.
+        self.croc_grid = SpatialHash()
+        self.fly_grid = SpatialHash()
+        # Every entity and lane ring ever built, reinitialized in place by later builds
+        # so a level change or game over doesn't allocate (and later collect) a level's
+        # worth of objects. Index k is the k-th of its kind in a level.
+        self._platform_pool: list[Platform] = []
+        self._croc_pool: list[Crocodile] = []
+        self._fly_pool: list[Fly] = []
+        self._ring_pool: list[deque[Platform]] = []
+        self._lane_plats: list[Platform] = []  # scratch for _generate_level
 
         self.last_horizontal_dir = 1
+        self.left_held = False
+        self.right_held = False
 
-        self._build_level(self.level)
-
-        # Draw a first frame immediately so if the loop fails to start,
-        # you still see something other than a black screen.
-        self._draw_background()
-        self._draw_hud()
-        pygame.display.flip()
-
-    def _handle_touch_events(self, event: pygame.event.Event) -> None:
-        if not self.touch.enabled:
-            return
-
-        def to_screen_pos(px: int, py: int) -> tuple[int, int]:
-            return px, py
-
-        def to_screen_pos_norm(nx: float, ny: float) -> tuple[int, int]:
-            return int(nx * WIDTH), int(ny * HEIGHT)
+        # Counters so callers can tell what happened without diffing state.
+        self.frame = 0
+        self.deaths = 0
+        self.flies_eaten = 0
+        # Bumped on every _build_level so renderers know when to refresh per-level caches.
+        self.builds = 0
+        # Frozen view of the current level for snapshots, made on first use.
+        self._layout: SimLayout | None = None
+        # Platform positions for later frames, for planners; made on first use.
+        self._timelines: LaneTimelines | None = None
+        # Regenerate levels the crossing planner can't get across (see frog_planner).
+        self.require_solvable = require_solvable
 
-        if event.type == pygame.FINGERDOWN:
-            x, y = to_screen_pos_norm(event.x, event.y)
-            self.touch.on_down(x, y)
-        elif event.type == pygame.FINGERMOTION:
-            x, y = to_screen_pos_norm(event.x, event.y)
-            self.touch.on_move(x, y)
-        elif event.type == pygame.FINGERUP:
-            x, y = to_screen_pos_norm(event.x, event.y)
-            self.touch.on_up(x, y)
-        elif event.type == pygame.MOUSEBUTTONDOWN:
-            x, y = to_screen_pos(event.pos[0], event.pos[1])
-            self.touch.on_down(x, y)
-        elif event.type == pygame.MOUSEMOTION:
-            x, y = to_screen_pos(event.pos[0], event.pos[1])
-            self.touch.on_move(x, y)
-        elif event.type == pygame.MOUSEBUTTONUP:
-            x, y = to_screen_pos(event.pos[0], event.pos[1])
-            self.touch.on_up(x, y)
+        self._build_level(self.level)
 
     def _lane_centers(self, lane_count: int) -> list[int]:
         # Lanes stacked in water area.
@@ -441,7 +1134,22 @@ class FrogCrossingGame:
         return centers
 
     def _build_level(self, level: int) -> None:
-        tune = tuning_for_level(level)
+        attempts = SOLVABLE_BUILD_ATTEMPTS if self.require_solvable else 1
+        for _ in range(attempts):
+            self._generate_level(level)
+            if attempts == 1 or self._is_solvable():
+                break
+        self.builds += 1
+        self._layout = None
+
+    def _is_solvable(self) -> bool:
+        # Imported here: the planner imports this module.
+        from frog_planner import is_solvable
+
+        return is_solvable(self)
+
+    def _generate_level(self, level: int) -> None:
+        tune = self.tuning if self.tuning is not None else tuning_for_level(level)
         self.platforms.clear()
         self.lanes.clear()
         self.crocs.clear()
@@ -457,137 +1165,175 @@ class FrogCrossingGame:
         # Minimum horizontal gap between platforms in the same lane.
         self.lane_gap = 32
 
+        lane_plats = self._lane_plats
         for i, lane_y in enumerate(lane_centers):
             direction = 1 if i % 2 == 0 else -1
             speed = direction * (tune.base_speed + 0.15 * (i % 3))
 
             # Mix of logs and lily pads
             count = tune.platform_count_per_lane
-            spacing = WIDTH / count
-            min_gap = self.lane_gap
-            self.lanes[i] = []
+            spacing = self.width / count
             # Build enough platforms so the lane looks populated immediately.
             # If total platform length is shorter than the screen width, you'll otherwise
             # get big empty regions until wrap cycles.
-            platforms_in_lane: list[Platform] = []
-            def make_platform() -> Platform:
-                kind = "log" if random.random() < 0.6 else "lilypad"
-                max_w = int(spacing - min_gap)
-                if kind == "log":
-                    lo = max(80, int(max_w * 0.50))
-                    hi = max(80, max_w)
-                    w = random.randint(lo, hi)
-                else:
-                    lo = max(60, int(max_w * 0.35))
-                    hi = max(60, int(max_w * 0.75))
-                    if hi < lo:
-                        hi = lo
-                    w = random.randint(lo, hi)
-                return Platform(i, lane_y, 0, w, plat_h, speed, kind)
-
+            lane_plats.clear()
             for _ in range(count):
-                platforms_in_lane.append(make_platform())
-
-            def lane_total_len(plats: list[Platform]) -> int:
-                if not plats:
-                    return 0
-                return sum(p.rect.width for p in plats) + self.lane_gap * (len(plats) - 1)
+                lane_plats.append(self._make_platform(len(lane_plats), i, lane_y, plat_h, speed, spacing))
 
             # Add extras until we cover the screen (plus a little buffer)
             # so multiple platforms are visible immediately.
-            target = WIDTH + 240
+            target = self.width + 240
             extra_limit = 6
-            while lane_total_len(platforms_in_lane) < target and extra_limit > 0:
-                platforms_in_lane.append(make_platform())
+            while _chain_length(lane_plats, self.lane_gap) < target and extra_limit > 0:
+                lane_plats.append(self._make_platform(len(lane_plats), i, lane_y, plat_h, speed, spacing))
                 extra_limit -= 1
 
-            for plat in platforms_in_lane:
+            for plat in lane_plats:
+                plat.order = len(self.platforms)
                 self.platforms.append(plat)
-                self.lanes[i].append(plat)
                 # Crocs ride on logs only
-                if plat.kind == "log" and random.random() < tune.croc_chance:
-                    self.crocs.append(Crocodile(plat))
+                if plat.kind == "log" and self.rng.random() < tune.croc_chance:
+                    self.crocs.append(self._make_croc(plat))
 
             # Arrange lane so platforms start entering from the movement side.
-            lane_plats = self.lanes[i]
-            random.shuffle(lane_plats)
+            self.rng.shuffle(lane_plats)
             jitter_gap = 18
-            total_len = sum(p.rect.width for p in lane_plats) + self.lane_gap * (len(lane_plats) - 1)
+            total_len = _chain_length(lane_plats, self.lane_gap)
             if speed > 0:
                 # Moving right: place a whole chain with a random phase so the lane
                 # looks populated immediately.
-                slack = max(0, total_len - WIDTH)
-                x_left = -random.randint(0, slack) - 40
+                slack = max(0, total_len - self.width)
+                x_left = -self.rng.randint(0, slack) - 40
                 for p in lane_plats:
                     p.rect.left = x_left
-                    x_left = p.rect.right + self.lane_gap + random.randint(0, jitter_gap)
+                    x_left = p.rect.right + self.lane_gap + self.rng.randint(0, jitter_gap)
             else:
                 # Moving left: same idea but laid out right-to-left.
-                slack = max(0, total_len - WIDTH)
-                x_right = WIDTH + random.randint(0, slack) + 40
+                slack = max(0, total_len - self.width)
+                x_right = self.width + self.rng.randint(0, slack) + 40
                 for p in lane_plats:
                     p.rect.right = x_right
-                    x_right = p.rect.left - self.lane_gap - random.randint(0, jitter_gap)
+                    x_right = p.rect.left - self.lane_gap - self.rng.randint(0, jitter_gap)
 
             # Final pass: resolve any accidental overlaps within the lane.
-            ordered = sorted(lane_plats, key=lambda p: p.rect.left)
-            for k in range(1, len(ordered)):
-                prev = ordered[k - 1]
-                cur = ordered[k]
+            lane_plats.sort(key=_rect_left)
+            for k in range(1, len(lane_plats)):
+                prev = lane_plats[k - 1]
+                cur = lane_plats[k]
                 min_left = prev.rect.right + self.lane_gap
                 if cur.rect.left < min_left:
                     cur.rect.left = min_left
+            ring = self.lanes[i] = self._ring(i)
+            ring.extend(lane_plats)
+
+        # Lanes are stacked without overlapping, so tops and bottoms are both sorted.
+        self._band_lanes = sorted(self.lanes, key=lambda lane_id: self.lanes[lane_id][0].rect.top)
+        self._band_tops = [self.lanes[lane_id][0].rect.top for lane_id in self._band_lanes]
+        self._band_bottoms = [self.lanes[lane_id][0].rect.bottom for lane_id in self._band_lanes]
 
         # Flies roam around the whole water area (so you can eat them while platforming)
         fly_speed = 1.0 + 0.25 * (level - 1)
-        for _ in range(tune.fly_count):
-            self.flies.append(Fly(self.water_area.inflate(-20, -20), fly_speed))
+        pool = self._fly_pool
+        for k in range(tune.fly_count):
+            if k < len(pool):
+                fly = pool[k]
+                fly.respawn(fly_speed, self.rng)
+            else:
+                fly = Fly(self._fly_area, fly_speed, self.rng)
+                pool.append(fly)
+            self.flies.append(fly)
 
         self.frog.reset(self.start_pos)
-
-    def _draw_background(self) -> None:
-        self.screen.fill(WATER)
-        pygame.draw.rect(self.screen, BANK, self.safe_top)
-        pygame.draw.rect(self.screen, BANK, self.safe_bottom)
-        # HUD bar
-        pygame.draw.rect(self.screen, (235, 235, 235), (0, 0, WIDTH, HUD_H))
-        pygame.draw.line(self.screen, (190, 190, 190), (0, HUD_H - 1), (WIDTH, HUD_H - 1), 2)
-
-    def _draw_hud(self) -> None:
-        txt = self.font.render(
-            f"Score: {self.score}    Level: {self.level}    Lives: {self.lives}",
-            True,
-            TEXT,
-        )
-        self.screen.blit(txt, (12, 12))
+        self._timelines = None
+        self._rebuild_grids()
+
+    def _make_platform(self, k: int, lane_id: int, lane_y: int, h: int, speed: float, spacing: float) -> Platform:
+        # The lane's k-th platform, from the pool when it has one.
+        kind = "log" if self.rng.random() < 0.6 else "lilypad"
+        max_w = int(spacing - self.lane_gap)
+        if kind == "log":
+            lo = max(80, int(max_w * 0.50))
+            hi = max(80, max_w)
+            w = self.rng.randint(lo, hi)
+        else:
+            lo = max(60, int(max_w * 0.35))
+            hi = max(60, int(max_w * 0.75))
+            if hi < lo:
+                hi = lo
+            w = self.rng.randint(lo, hi)
+        pool = self._platform_pool
+        index = len(self.platforms) + k
+        if index < len(pool):
+            plat = pool[index]
+            plat.reset(lane_id, lane_y, 0, w, h, speed, kind)
+        else:
+            plat = Platform(lane_id, lane_y, 0, w, h, speed, kind)
+            pool.append(plat)
+        return plat
+
+    def _make_croc(self, plat: Platform) -> Crocodile:
+        pool = self._croc_pool
+        index = len(self.crocs)
+        if index < len(pool):
+            croc = pool[index]
+            croc.reset(plat)
+        else:
+            croc = Crocodile(plat)
+            pool.append(croc)
+        return croc
+
+    def _ring(self, lane_id: int) -> deque[Platform]:
+        # Lane lane_id's ring, emptied.
+        pool = self._ring_pool
+        while len(pool) <= lane_id:
+            pool.append(deque())
+        ring = pool[lane_id]
+        ring.clear()
+        return ring
+
+    def _rebuild_grids(self) -> None:
+        self.croc_grid.rebuild(self.crocs)
+        self.fly_grid.rebuild(self.flies)
 
     def _clamp_frog(self) -> None:
         half_w = self.frog.w / 2
         half_h = self.frog.h / 2
 
-        self.frog.pos.x = max(half_w, min(WIDTH - half_w, self.frog.pos.x))
-        self.frog.pos.y = max(HUD_H + half_h, min(HEIGHT - half_h, self.frog.pos.y))
+        self.frog.pos.x = max(half_w, min(self.width - half_w, self.frog.pos.x))
+        self.frog.pos.y = max(HUD_H + half_h, min(self.height - half_h, self.frog.pos.y))
         self.frog.rect.center = (int(self.frog.pos.x), int(self.frog.pos.y))
 
     def _clamp_frog_y_only(self) -> None:
         half_h = self.frog.h / 2
-        self.frog.pos.y = max(HUD_H + half_h, min(HEIGHT - half_h, self.frog.pos.y))
+        self.frog.pos.y = max(HUD_H + half_h, min(self.height - half_h, self.frog.pos.y))
         self.frog.rect.center = (int(self.frog.pos.x), int(self.frog.pos.y))
 
     def _frog_on_platform(self) -> Platform | None:
         # Frog must be supported when in water.
         # If overlapping multiple platforms, choose the one with the biggest overlap.
+        # Ties go to the platform earliest in self.platforms, as a linear scan would.
         frog_rect = self.frog.rect
         best: Platform | None = None
         best_area = 0
-        for p in self.platforms:
-            if not frog_rect.colliderect(p.rect):
-                continue
-            inter = frog_rect.clip(p.rect)
-            area = inter.width * inter.height
-            if area > best_area:
-                best_area = area
-                best = p
+
+        # Only lane bands overlapping the frog vertically can hold it up.
+        b = bisect_right(self._band_bottoms, frog_rect.top)
+        while b < len(self._band_tops) and self._band_tops[b] < frog_rect.bottom:
+            ordered = self.lanes[self._band_lanes[b]]
+            b += 1
+            # Platforms in a lane never overlap, so rights are sorted like lefts:
+            # skip everything ending left of the frog, stop once past its right edge.
+            k = bisect_right(ordered, frog_rect.left, key=_rect_right)
+            while k < len(ordered):
+                p = ordered[k]
+                k += 1
+                if p.rect.left >= frog_rect.right:
+                    break
+                inter = frog_rect.clip(p.rect)
+                area = inter.width * inter.height
+                if area > best_area or (area == best_area and best is not None and p.order < best.order):
+                    best_area = area
+                    best = p
         return best
 
     def _current_support(self) -> Platform | None:
@@ -596,6 +1342,7 @@ class FrogCrossingGame:
         return self._frog_on_platform()
 
     def _handle_death_reset(self) -> None:
+        self.deaths += 1
         self.lives -= 1
         if self.lives <= 0:
             # Restart the stage (same level) when out of lives.
@@ -637,14 +1384,11 @@ class FrogCrossingGame:
         if support is None:
             return
 
-        keys = pygame.key.get_pressed()
         dx = 0.0
-        left = keys[pygame.K_LEFT] or keys[pygame.K_a] or (self.touch.enabled and self.touch.left_held)
-        right = keys[pygame.K_RIGHT] or keys[pygame.K_d] or (self.touch.enabled and self.touch.right_held)
-        if left:
+        if self.left_held:
             dx -= WALK_SPEED
             self.last_horizontal_dir = -1
-        if right:
+        if self.right_held:
             dx += WALK_SPEED
             self.last_horizontal_dir = 1
 
@@ -655,285 +1399,812 @@ class FrogCrossingGame:
         self.frog.rect.center = (int(self.frog.pos.x), int(self.frog.pos.y))
 
         # Lose a life if you walk off-screen while riding.
-        if self.frog.rect.right < 0 or self.frog.rect.left > WIDTH:
+        if self.frog.rect.right < 0 or self.frog.rect.left > self.width:
             self._handle_death_reset()
             return
 
         # Keep vertical bounds safe.
         self._clamp_frog_y_only()
 
-    def run(self) -> None:
-        running = True
-        while running:
-            self.clock.tick(FPS)
+    def press(self, action: str) -> None:
+        if action == "up":
+            self._attempt_hop(0, -STEP_Y)
+        elif action == "down":
+            self._attempt_hop(0, STEP_Y)
+        elif action == "left":
+            # On a platform in water: walking is handled per-frame; on land: hop.
+            if self._current_support() is None:
+                self._attempt_hop(-STEP_X, 0)
+            else:
+                self.last_horizontal_dir = -1
+        elif action == "right":
+            if self._current_support() is None:
+                self._attempt_hop(STEP_X, 0)
+            else:
+                self.last_horizontal_dir = 1
+        elif action == "jump":
+            # Side jump to nearby platform (same lane feel): jump + last direction
+            self._attempt_hop(self.last_horizontal_dir * STEP_X, 0)
+
+    def _update_lanes(self) -> None:
+        # Lanes are rings in x order, so the platform about to leave the screen is
+        # always at the leading end. Wrapping rotates it round to the trailing end,
+        # one lane_gap behind the current tail, which keeps the ring sorted and the
+        # gaps intact without any per-frame sorting or overlap fixing.
+        # A fresh lane often overhangs the wrap margin with several platforms, and
+        # they re-enter leader first (the list-order version re-entered them in
+        # shuffled build order and then fixed overlaps). So seeded layouts differ from
+        # before the rings from frame 1 on, in about 2 of 5 levels. LaneTimelines,
+        # BatchSim and recordings all follow this order.
+        gap = self.lane_gap
+        width = self.width
+        for ring in self.lanes.values():
+            for p in ring:
+                p.update()
+
+            if ring[0].speed > 0:
+                # Moving right: the rightmost re-enters on the left.
+                while ring[-1].needs_wrap(width):
+                    ring.rotate(1)
+                    ring[0].rect.right = ring[1].rect.left - gap
+            else:
+                # Moving left: the leftmost re-enters on the right.
+                while ring[0].needs_wrap(width):
+                    ring.rotate(-1)
+                    ring[-1].rect.left = ring[-2].rect.right + gap
+
+    def _resolve_frog(self) -> None:
+        # If frog is in water, it must be on a moving log/lilypad and gets carried by it
+        in_water = self.water_area.collidepoint(self.frog.rect.center)
+        if in_water:
+            support = self._frog_on_platform()
+            if support is None:
+                self._handle_death_reset()
+            else:
+                # carry by platform speed
+                self.frog.pos.x += support.dx_last
+                self.frog.rect.center = (int(self.frog.pos.x), int(self.frog.pos.y))
 
-            for event in pygame.event.get():
-                if event.type == pygame.QUIT:
-                    running = False
-                elif event.type == pygame.KEYDOWN:
-                    if event.key == pygame.K_ESCAPE:
-                        running = False
-                    elif event.key in (pygame.K_UP, pygame.K_w):
-                        self._attempt_hop(0, -STEP_Y)
-                    elif event.key in (pygame.K_DOWN, pygame.K_s):
-                        self._attempt_hop(0, STEP_Y)
-                    elif event.key in (pygame.K_LEFT, pygame.K_a):
-                        # On a platform in water: walking is handled per-frame; on land: hop.
-                        if self._current_support() is None:
-                            self._attempt_hop(-STEP_X, 0)
-                        else:
-                            self.last_horizontal_dir = -1
-                    elif event.key in (pygame.K_RIGHT, pygame.K_d):
-                        if self._current_support() is None:
-                            self._attempt_hop(STEP_X, 0)
-                        else:
-                            self.last_horizontal_dir = 1
-                    elif event.key == pygame.K_SPACE:
-                        # Side jump to nearby platform (same lane feel): space + last direction
-                        self._attempt_hop(self.last_horizontal_dir * STEP_X, 0)
-
-                # Touch + mouse
-                self._handle_touch_events(event)
-
-                if self.touch.enabled and event.type in (pygame.FINGERDOWN, pygame.MOUSEBUTTONDOWN):
-                    action = self.touch.consume_tap_action()
-                    if action == "up":
-                        self._attempt_hop(0, -STEP_Y)
-                    elif action == "down":
-                        self._attempt_hop(0, STEP_Y)
-                    elif action == "left":
-                        if self._current_support() is None:
-                            self._attempt_hop(-STEP_X, 0)
-                        else:
-                            self.last_horizontal_dir = -1
-                    elif action == "right":
-                        if self._current_support() is None:
-                            self._attempt_hop(STEP_X, 0)
-                        else:
-                            self.last_horizontal_dir = 1
-                    elif action == "jump":
-                        self._attempt_hop(self.last_horizontal_dir * STEP_X, 0)
-
-            self.frog.update()
-
-            # Update platforms lane-by-lane so wrap re-entry can't overlap.
-            for lane_id, plats in self.lanes.items():
-                for p in plats:
-                    p.update()
-
-                # Lane-aware wrapping: reinsert behind the last platform in that lane.
-                for p in plats:
-                    if not p.needs_wrap():
-                        continue
-
-                    if p.speed > 0:
-                        # Moving right: re-enter on the left behind the current leftmost.
-                        leftmost = min(plats, key=lambda q: q.rect.left)
-                        p.rect.right = leftmost.rect.left - self.lane_gap
-                    else:
-                        # Moving left: re-enter on the right beyond the current rightmost.
-                        rightmost = max(plats, key=lambda q: q.rect.right)
-                        p.rect.left = rightmost.rect.right + self.lane_gap
-
-                # Safety: resolve any overlaps caused by multiple wraps in one frame.
-                ordered = sorted(plats, key=lambda q: q.rect.left)
-                for i in range(1, len(ordered)):
-                    prev = ordered[i - 1]
-                    cur = ordered[i]
-                    min_left = prev.rect.right + self.lane_gap
-                    if cur.rect.left < min_left:
-                        cur.rect.left = min_left
-
-            for c in self.crocs:
-                c.update()
-
-            for f in self.flies:
-                f.update()
-
-            # If frog is in water, it must be on a moving log/lilypad and gets carried by it
-            in_water = self.water_area.collidepoint(self.frog.rect.center)
-            if in_water:
-                support = self._frog_on_platform()
-                if support is None:
+                # Lose a life if carried completely off-screen by a log/lilypad.
+                if self.frog.rect.right < 0 or self.frog.rect.left > self.width:
                     self._handle_death_reset()
                 else:
-                    # carry by platform speed
-                    self.frog.pos.x += support.dx_last
-                    self.frog.rect.center = (int(self.frog.pos.x), int(self.frog.pos.y))
-
-                    # Lose a life if carried completely off-screen by a log/lilypad.
-                    if self.frog.rect.right < 0 or self.frog.rect.left > WIDTH:
-                        self._handle_death_reset()
-                    else:
-                        # Allow sideways movement while riding.
-                        self._walk_if_on_platform(support)
-                        # Keep vertical bounds safe while allowing off-screen loss logic.
-                        self._clamp_frog_y_only()
-
-            # Crocodile hazard
-            for c in self.crocs:
-                if self.frog.rect.colliderect(c.rect):
-                    self._handle_death_reset()
-                    break
+                    # Allow sideways movement while riding.
+                    self._walk_if_on_platform(support)
+                    # Keep vertical bounds safe while allowing off-screen loss logic.
+                    self._clamp_frog_y_only()
+
+        # Crocodile hazard
+        if self.croc_grid.query(self.frog.rect):
+            self._handle_death_reset()
+
+        # Eat flies, last in self.flies first (respawns draw from the RNG in that order)
+        eaten = self.fly_grid.query(self.frog.rect)
+        if eaten:
+            if len(eaten) > 1:
+                eaten.sort(key=self.flies.index, reverse=True)
+            for fly in eaten:
+                self.score += 100
+                self.flies_eaten += 1
+                # respawn fly somewhere else
+                fly.respawn(1.0 + 0.25 * (self.level - 1), self.rng)
+                self.fly_grid.move(fly)
+
+        # Win condition: reach the other side (top safe bank)
+        if self.frog.rect.colliderect(self.safe_top):
+            self._handle_level_complete()
+
+    def lane_timelines(self) -> LaneTimelines:
+        # Lane motion doesn't depend on the frog, so one LaneTimelines serves the whole
+        # level: t in its queries is self.frame minus its .frame.
+        tl = self._timelines
+        if tl is None or tl.builds != self.builds or tl.frame > self.frame:
+            tl = self._timelines = LaneTimelines(self)
+        return tl
+
+    def _freeze_layout(self) -> SimLayout:
+        lanes = tuple((lane_id, tuple(ring)) for lane_id, ring in self.lanes.items())
+        ring_pos = [0] * len(self.platforms)
+        for _, members in lanes:
+            for k, p in enumerate(members):
+                ring_pos[p.order] = k
+        return SimLayout(
+            platforms=tuple(self.platforms),
+            crocs=tuple(self.crocs),
+            flies=tuple(self.flies),
+            platform_specs=tuple(
+                (p.lane_id, p.rect.top + p.rect.height // 2, 0, p.rect.width, p.rect.height, p.speed, p.kind)
+                for p in self.platforms
+            ),
+            croc_platforms=tuple(c.platform.order for c in self.crocs),
+            lanes=lanes,
+            ring_pos=tuple(ring_pos),
+            band_lanes=self._band_lanes,
+            band_tops=self._band_tops,
+            band_bottoms=self._band_bottoms,
+        )
+
+    def snapshot(self) -> SimSnapshot:
+        # Everything step() can change, as two flat buffers:
+        #   ints:   counters, held input, frog rect/cooldown, every platform x, then
+        #           every platform dx_last, per lane the ring rotation, per croc (offset_x, x)
+        #   floats: frog pos, per fly (pos, vel, facing)
+        # The level's objects themselves are shared through the layout.
+        layout = self._layout
+        if layout is None:
+            layout = self._layout = self._freeze_layout()
+        frog = self.frog
+        plats = self.platforms
+        ring_pos = layout.ring_pos
+        ints = array("q", (
+            self.score, self.level, self.lives, self.deaths, self.flies_eaten, self.frame,
+            self.last_horizontal_dir, self.left_held, self.right_held,
+            frog.rect.x, frog.rect.y, frog._move_cooldown,
+        ))
+        ints.extend([p.rect.x for p in plats])
+        ints.extend([p.dx_last for p in plats])
+        ints.extend([ring_pos[ring[0].order] for ring in self.lanes.values()])
+        for c in self.crocs:
+            ints.append(c.offset_x)
+            ints.append(c.rect.x)
+        floats = array("d", (frog.pos.x, frog.pos.y))
+        for f in self.flies:
+            floats.extend((f.pos.x, f.pos.y, f.vel.x, f.vel.y, f.facing_deg))
+        return SimSnapshot(ints, floats, self.rng.getstate(), layout)
+
+    def restore(self, snap: SimSnapshot) -> None:
+        layout = snap.layout
+        other_level = layout is not self._layout
+        if other_level:
+            # Snapshot from another level: put its objects back in place, reinitialized
+            # since later builds may have reused them.
+            self.platforms[:] = layout.platforms
+            for order, (p, spec) in enumerate(zip(layout.platforms, layout.platform_specs)):
+                p.reset(*spec)
+                p.order = order
+            self.crocs[:] = layout.crocs
+            for c, order in zip(layout.crocs, layout.croc_platforms):
+                c.reset(layout.platforms[order])
+            self.flies[:] = layout.flies
+            self.lanes.clear()
+            for lane_id, members in layout.lanes:
+                ring = self.lanes[lane_id] = self._ring(lane_id)
+                ring.extend(members)
+            self._band_lanes = layout.band_lanes
+            self._band_tops = layout.band_tops
+            self._band_bottoms = layout.band_bottoms
+            self._layout = layout
+            # Still a different level for anyone caching per build.
+            self.builds += 1
+
+        d = snap.ints
+        (self.score, self.level, self.lives, self.deaths, self.flies_eaten, self.frame,
+         self.last_horizontal_dir, left, right, x, y, self.frog._move_cooldown) = d[0:12]
+        self.left_held = bool(left)
+        self.right_held = bool(right)
+        self.frog.rect.topleft = (x, y)
+
+        plats = self.platforms
+        n = len(plats)
+        i = 12
+        for p, x, dx in zip(plats, d[i:i + n], d[i + n:i + 2 * n]):
+            p.rect.x = x
+            p.dx_last = dx
+        i += 2 * n
+        lanes = self.lanes
+        for (lane_id, members), rot in zip(layout.lanes, d[i:i + len(lanes)]):
+            ring = lanes[lane_id]
+            if ring[0] is not members[rot]:
+                ring.rotate(-ring.index(members[rot]))
+        i += len(lanes)
+        for c in self.crocs:
+            c.offset_x = d[i]
+            c.rect.x = d[i + 1]
+            i += 2
+
+        fl = snap.floats
+        self.frog.pos.update(fl[0], fl[1])
+        i = 2
+        for f in self.flies:
+            f.pos.update(fl[i], fl[i + 1])
+            f.vel.update(fl[i + 2], fl[i + 3])
+            f.facing_deg = fl[i + 4]
+            f.sync_rect()
+            i += 5
+        self.rng.setstate(snap.rng_state)
+        if other_level:
+            self._rebuild_grids()
+        else:
+            self.croc_grid.move_all(self.crocs)
+            self.fly_grid.move_all(self.flies)
+
+    def step(self, inp: StepInput) -> StepResult:
+        level_before = self.level
+        deaths_before = self.deaths
+        eaten_before = self.flies_eaten
+
+        for action in inp.presses:
+            self.press(action)
+        self.left_held = inp.left_held
+        self.right_held = inp.right_held
+        prof = self.profiler
+        prof.lap("bookkeeping")
+
+        self.frog.update()
+        prof.lap("frog")
+        self._update_lanes()
+        prof.lap("lanes")
+
+        for c in self.crocs:
+            c.update()
+        self.croc_grid.move_all(self.crocs)
+
+        for f in self.flies:
+            f.update()
+        self.fly_grid.move_all(self.flies)
+        prof.lap("crocs_flies")
+
+        self._resolve_frog()
+        prof.lap("collide")
+        self.frame += 1
+
+        return StepResult(
+            score=self.score,
+            level=self.level,
+            lives=self.lives,
+            deaths=self.deaths - deaths_before,
+            flies_eaten=self.flies_eaten - eaten_before,
+            level_complete=self.level != level_before,
+        )
+
+
+def _merge_dirty(before: list[pygame.Rect], after: list[pygame.Rect]) -> list[pygame.Rect]:
+    # Entities are drawn in the same order every frame, so pairing each one's old
+    # and new rect gives one small union per entity instead of two rects.
+    # Off-screen sprites blit to empty rects and are dropped.
+    if len(before) != len(after):
+        return [r for r in before + after if r.width and r.height]
+    merged = []
+    for old, new in zip(before, after):
+        if not (old.width and old.height):
+            old = new
+        elif new.width and new.height:
+            old = old.union(new)
+        if old.width and old.height:
+            merged.append(old)
+    return merged
+
+
+# Keyboard bindings for the discrete actions FrogSim.press understands.
+KEY_ACTIONS = {
+    pygame.K_UP: "up",
+    pygame.K_w: "up",
+    pygame.K_DOWN: "down",
+    pygame.K_s: "down",
+    pygame.K_LEFT: "left",
+    pygame.K_a: "left",
+    pygame.K_RIGHT: "right",
+    pygame.K_d: "right",
+    pygame.K_SPACE: "jump",
+}
+
+# Discrete actions for bots and batch engines. Left/right press and hold in the
+# same frame, which is what a one-frame key tap does in the real game.
+ACTIONS = ("noop", "up", "down", "left", "right", "jump")
+ACTION_INPUTS = (
+    StepInput(),
+    StepInput(presses=("up",)),
+    StepInput(presses=("down",)),
+    StepInput(presses=("left",), left_held=True),
+    StepInput(presses=("right",), right_held=True),
+    StepInput(presses=("jump",)),
+)
+
+
+class FrogCrossingGame:
+    def __init__(self, seed: int | None = None, record: str | None = None) -> None:
+        started = time.perf_counter()
+        # Only the modules we use: pygame.init() would also open the mixer, which costs
+        # startup time and on web/mobile can trip autoplay restrictions (and sometimes a
+        # "black screen"). We don't use audio.
+        pygame.display.init()
+        pygame.font.init()
+
+        self.is_web = sys.platform == "emscripten"
+
+        flags = pygame.RESIZABLE
+        if not self.is_web:
+            flags |= pygame.SCALED
+        try:
+            self.screen = pygame.display.set_mode((WIDTH, HEIGHT), flags)
+        except Exception:
+            self.screen = pygame.display.set_mode((WIDTH, HEIGHT))
+        pygame.display.set_caption("Frog Crossing")
+        self.clock = pygame.time.Clock()
+        # Font(None) is the bundled default font, which is what SysFont(None) returns
+        # too, minus the scan of the system font directories.
+        self.font = pygame.font.Font(None, 28)
+        self._profile_font = pygame.font.Font(None, 20)
+        self._hud: pygame.Surface | None = None
+        self._hud_key: tuple[int, int, int] | None = None
+
+        self.sprites = SpriteBank(Path(__file__).parent / "assets")
+
+        self.touch = TouchControls(enabled=TOUCH_UI and self.is_web)
+
+        if self.is_web:
+            print("[frog] web init ok")
+        else:
+            print("[frog] desktop init ok")
+
+        profile = os.environ.get("FROG_PROFILE", "")
+        self._profile_requested = profile not in ("", "0")
+        self._profile_out = profile if self._profile_requested and profile != "1" else PROFILE_DEFAULT_OUT
+        self.profiler = FrameProfiler(enabled=self._profile_requested)
+        self._show_profile = False
+        self._profile_overlay: pygame.Surface | None = None
+
+        # Always play from a known seed so a reported session can be reproduced.
+        self.seed = seed if seed is not None else random.randrange(2**32)
+        print(f"[frog] seed {self.seed}")
+        # Created by the "level" startup stage; see load().
+        self.sim: FrogSim | None = None
+        self.running = True
+        self._record = record
+        self.recorder = None
+
+        # Static layer (water, banks, HUD chrome), re-baked once per level build.
+        self._background: pygame.Surface | None = None
+        self._background_builds = -1
+        # Screen areas touched last frame; restored from the background before redrawing.
+        self._dirty: list[pygame.Rect] = []
+        self._full_redraw = True
+        self._dirty_rects_ok = DIRTY_RECTS
+
+        # Fixed-timestep state. Presses wait in _pending until the next sim step;
+        # _prev_pos holds every entity's position before the latest step, keyed by id()
+        # (flies by id() and spawn count: an eaten fly respawns as the same object).
+        self._sim_dt = 1.0 / SIM_HZ
+        self._accumulator = 0.0
+        self._pending: list[str] = []
+        self._prev_pos: dict[int | tuple[int, int], tuple[float, float]] = {}
+        self._prev_builds = -1
+        self._alpha = 1.0
+
+        # Pacing: the current target rate and a smoothed cost of one frame's work.
+        self.pacing_hz = FPS
+        self.frame_ms = 0.0
+        self._slow = False
+        self._focused = True
+        self._visible = True
+        self._was_paused = False
+        self._last_input = time.perf_counter()
+
+        # Startup timings in ms since construction: first_frame, assets, interactive.
+        self._started = started
+        self.startup_ms: dict[str, float] = {}
+        # Draw a first frame immediately so if the loop fails to start,
+        # you still see something other than a black screen.
+        self._draw_loading(0.0, "")
+        self.startup_ms["first_frame"] = (time.perf_counter() - started) * 1000.0
+
+    def _startup_stages(self) -> list[tuple[str, Callable[[], object]]]:
+        stages = [("atlas", self.sprites.load_atlas)]
+        stages += [(name, partial(self.sprites.base, name)) for name in SPRITE_NAMES]
+        stages.append(("level", self._start_sim))
+        stages.append(("sprites", self._warm_sprites))
+        if self.touch.enabled:
+            stages.append(("controls", self.touch.bake))
+        return stages
+
+    def _start_sim(self) -> None:
+        self.sim = FrogSim(seed=self.seed, profiler=self.profiler)
+        self._bake_background()
+        if self._record is not None:
+            from frog_replay import InputRecorder
+
+            self.recorder = InputRecorder(self._record, self.seed, self.sim.level)
+
+    def _warm_sprites(self) -> None:
+        # Scale everything the first level shows, and every fly rotation, off screen
+        # so the first playable frames don't stall on transforms.
+        scratch = pygame.Surface((WIDTH, HEIGHT))
+        for obj in (*self.sim.platforms, *self.sim.crocs, self.sim.frog):
+            obj.draw(scratch, self.sprites)
+        if not ROTATION_ATLAS:
+            size = Fly.r * 2
+            fly_size = (size * FLY_SPRITE_SCALE_X, size * FLY_SPRITE_SCALE_Y)
+            for angle in range(0, 360, FLY_ANGLE_STEP):
+                self.sprites.get_rotated("fly", fly_size, angle, FLY_ANGLE_STEP)
+
+    def _draw_loading(self, progress: float, label: str) -> None:
+        screen = self.screen
+        screen.fill(WATER)
+        title = self.font.render("Frog Crossing", True, WHITE)
+        screen.blit(title, (WIDTH // 2 - title.get_width() // 2, HEIGHT // 2 - 48))
+        bar = pygame.Rect(0, 0, 320, 14)
+        bar.center = (WIDTH // 2, HEIGHT // 2)
+        pygame.draw.rect(screen, BANK, (bar.x, bar.y, round(bar.width * progress), bar.height))
+        pygame.draw.rect(screen, WHITE, bar, 2)
+        if label:
+            txt = self.font.render(f"Loading {label}...", True, WHITE)
+            screen.blit(txt, (WIDTH // 2 - txt.get_width() // 2, bar.bottom + 12))
+        pygame.display.flip()
+        # Keep the window responsive (and closable) while loading.
+        pygame.event.pump()
+
+    def _finish_loading(self, assets_started: float) -> None:
+        now = time.perf_counter()
+        self.startup_ms["assets"] = (now - assets_started) * 1000.0
+        self._draw()
+        self.startup_ms["interactive"] = (time.perf_counter() - self._started) * 1000.0
+        self._last_input = time.perf_counter()
+        ms = self.startup_ms
+        print(
+            f"[frog] startup: first frame {ms['first_frame']:.0f} ms, "
+            f"interactive {ms['interactive']:.0f} ms (assets {ms['assets']:.0f} ms)"
+        )
+
+    def load(self) -> None:
+        # Run every startup stage now, redrawing the progress bar between them.
+        start = time.perf_counter()
+        stages = self._startup_stages()
+        for i, (label, stage) in enumerate(stages):
+            self._draw_loading(i / len(stages), label)
+            stage()
+        self._finish_loading(start)
+
+    async def load_async(self) -> None:
+        # Same stages as load(), but each gets its own browser frame so the progress
+        # bar actually shows and the page stays responsive.
+        start = time.perf_counter()
+        stages = self._startup_stages()
+        for i, (label, stage) in enumerate(stages):
+            self._draw_loading(i / len(stages), label)
+            await asyncio.sleep(0)
+            stage()
+        self._finish_loading(start)
+
+    def _handle_touch_events(self, event: pygame.event.Event) -> None:
+        if not self.touch.enabled:
+            return
+
+        def to_screen_pos(px: int, py: int) -> tuple[int, int]:
+            return px, py
+
+        def to_screen_pos_norm(nx: float, ny: float) -> tuple[int, int]:
+            return int(nx * WIDTH), int(ny * HEIGHT)
 
-            # Eat flies
-            for i in range(len(self.flies) - 1, -1, -1):
-                if self.frog.rect.colliderect(self.flies[i].rect):
-                    self.score += 100
-                    # respawn fly somewhere else
-                    self.flies[i] = Fly(self.water_area.inflate(-20, -20), 1.0 + 0.25 * (self.level - 1))
-
-            # Win condition: reach the other side (top safe bank)
-            if self.frog.rect.colliderect(self.safe_top):
-                self._handle_level_complete()
-
-            # Draw
-            self._draw_background()
-            for p in self.platforms:
-                p.draw(self.screen, self.sprites)
-            for c in self.crocs:
-                c.draw(self.screen, self.sprites)
-            for f in self.flies:
-                f.draw(self.screen, self.sprites)
-            self.frog.draw(self.screen, self.sprites)
-            if self.touch.enabled:
-                self.touch.draw(self.screen)
-            self._draw_hud()
+        if event.type == pygame.FINGERDOWN:
+            x, y = to_screen_pos_norm(event.x, event.y)
+            self.touch.on_down(x, y)
+        elif event.type == pygame.FINGERMOTION:
+            x, y = to_screen_pos_norm(event.x, event.y)
+            self.touch.on_move(x, y)
+        elif event.type == pygame.FINGERUP:
+            x, y = to_screen_pos_norm(event.x, event.y)
+            self.touch.on_up(x, y)
+        elif event.type == pygame.MOUSEBUTTONDOWN:
+            x, y = to_screen_pos(event.pos[0], event.pos[1])
+            self.touch.on_down(x, y)
+        elif event.type == pygame.MOUSEMOTION:
+            x, y = to_screen_pos(event.pos[0], event.pos[1])
+            self.touch.on_move(x, y)
+        elif event.type == pygame.MOUSEBUTTONUP:
+            x, y = to_screen_pos(event.pos[0], event.pos[1])
+            self.touch.on_up(x, y)
+
+    def _poll_input(self) -> StepInput:
+        presses: list[str] = []
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT:
+                self.running = False
+            elif event.type == pygame.KEYDOWN:
+                if event.key == pygame.K_ESCAPE:
+                    self.running = False
+                elif event.key == pygame.K_F3:
+                    # The profiler follows at the next frame's start (see _frame).
+                    self._show_profile = not self._show_profile
+                    self._profile_overlay = None
+                elif event.key in KEY_ACTIONS:
+                    presses.append(KEY_ACTIONS[event.key])
+            elif event.type == pygame.WINDOWFOCUSLOST:
+                self._focused = False
+            elif event.type == pygame.WINDOWFOCUSGAINED:
+                self._focused = True
+                self._full_redraw = True
+            elif event.type in (pygame.WINDOWHIDDEN, pygame.WINDOWMINIMIZED):
+                self._visible = False
+            elif event.type in (pygame.WINDOWSHOWN, pygame.WINDOWRESTORED, pygame.WINDOWEXPOSED):
+                self._visible = True
+                # The window's contents may be gone; dirty rects would only patch them.
+                self._full_redraw = True
+
+            # Touch + mouse
+            self._handle_touch_events(event)
+
+            if self.touch.enabled and event.type in (pygame.FINGERDOWN, pygame.MOUSEBUTTONDOWN):
+                action = self.touch.consume_tap_action()
+                if action is not None:
+                    presses.append(action)
 
+        keys = pygame.key.get_pressed()
+        left = keys[pygame.K_LEFT] or keys[pygame.K_a] or (self.touch.enabled and self.touch.left_held)
+        right = keys[pygame.K_RIGHT] or keys[pygame.K_d] or (self.touch.enabled and self.touch.right_held)
+        if presses or left or right:
+            self._last_input = time.perf_counter()
+        return StepInput(presses=tuple(presses), left_held=bool(left), right_held=bool(right))
+
+    def _bake_background(self) -> None:
+        bg = pygame.Surface((WIDTH, HEIGHT)).convert()
+        bg.fill(WATER)
+        pygame.draw.rect(bg, BANK, self.sim.safe_top)
+        pygame.draw.rect(bg, BANK, self.sim.safe_bottom)
+        # HUD bar
+        pygame.draw.rect(bg, (235, 235, 235), (0, 0, WIDTH, HUD_H))
+        pygame.draw.line(bg, (190, 190, 190), (0, HUD_H - 1), (WIDTH, HUD_H - 1), 2)
+        self._background = bg
+        self._background_builds = self.sim.builds
+        if ROTATION_ATLAS:
+            size = Fly.r * 2
+            self.sprites.build_rotation_atlas(
+                "fly", (size * FLY_SPRITE_SCALE_X, size * FLY_SPRITE_SCALE_Y), FLY_ANGLE_STEP
+            )
+        self._full_redraw = True
+
+    def _draw_hud(self) -> pygame.Rect:
+        # Re-render only when a displayed value changes.
+        key = (self.sim.score, self.sim.level, self.sim.lives)
+        if key != self._hud_key:
+            self._hud_key = key
+            self._hud = self.font.render(
+                f"Score: {key[0]}    Level: {key[1]}    Lives: {key[2]}",
+                True,
+                TEXT,
+            )
+        return self.screen.blit(self._hud, (12, 12))
+
+    def _remember_positions(self) -> None:
+        sim = self.sim
+        prev = self._prev_pos
+        prev.clear()
+        for p in sim.platforms:
+            prev[id(p)] = p.rect.topleft
+        for c in sim.crocs:
+            prev[id(c)] = c.rect.topleft
+        for f in sim.flies:
+            prev[(id(f), f.spawns)] = (f.pos.x, f.pos.y)
+        prev[id(sim.frog)] = sim.frog.rect.topleft
+        self._prev_builds = sim.builds
+
+    def _lerp_offset(self, key: int | tuple[int, int], x: float, y: float) -> tuple[int, int]:
+        # Offset from the simulated position back towards the previous one, so the
+        # sprite lands _alpha of the way through the last step.
+        prev = self._prev_pos.get(key)
+        if prev is None:
+            return (0, 0)
+        dx = prev[0] - x
+        dy = prev[1] - y
+        if abs(dx) > INTERP_MAX_DISTANCE or abs(dy) > INTERP_MAX_DISTANCE:
+            return (0, 0)
+        back = 1.0 - self._alpha
+        return (round(dx * back), round(dy * back))
+
+    def _draw_entities(self) -> list[pygame.Rect]:
+        sim = self.sim
+        screen = self.screen
+        sprites = self.sprites
+        drawn: list[pygame.Rect] = []
+        if self._prev_builds == sim.builds and self._alpha < 1.0:
+            lerp = self._lerp_offset
+            for p in sim.platforms:
+                drawn.append(p.draw(screen, sprites, lerp(id(p), p.rect.x, p.rect.y)))
+            for c in sim.crocs:
+                drawn.append(c.draw(screen, sprites, lerp(id(c), c.rect.x, c.rect.y)))
+            for f in sim.flies:
+                drawn.append(f.draw(screen, sprites, lerp((id(f), f.spawns), f.pos.x, f.pos.y)))
+            frog = sim.frog
+            drawn.append(frog.draw(screen, sprites, lerp(id(frog), frog.rect.x, frog.rect.y)))
+        else:
+            # Nothing to interpolate from (first frame, new level).
+            for p in sim.platforms:
+                drawn.append(p.draw(screen, sprites))
+            for c in sim.crocs:
+                drawn.append(c.draw(screen, sprites))
+            for f in sim.flies:
+                drawn.append(f.draw(screen, sprites))
+            drawn.append(sim.frog.draw(screen, sprites))
+        if self.touch.enabled:
+            drawn.extend(self.touch.draw(self.screen))
+        self.profiler.lap("entities")
+        drawn.append(self._draw_hud())
+        if self._show_profile:
+            drawn.append(self._draw_profile())
+        self.profiler.lap("hud")
+        return drawn
+
+    def _draw_profile(self) -> pygame.Rect:
+        # Re-render the table twice a second; rendering it every frame would skew it.
+        prof = self.profiler
+        if self._profile_overlay is None or prof.frames % 30 == 0:
+            font = self._profile_font
+            rows = [("ms", "p50", "p95", "p99")]
+            for phase, values in prof.percentiles().items():
+                rows.append((phase, *(f"{v:.2f}" for v in values)))
+            rows.append((f"pacing {self.pacing_hz} Hz", "", "", ""))
+            # Name column left-aligned, numbers right-aligned at fixed column edges.
+            edges = (0, 150, 200, 250)
+            overlay = pygame.Surface((edges[-1] + 16, 16 * len(rows) + 12), pygame.SRCALPHA)
+            overlay.fill((0, 0, 0, 170))
+            for i, row in enumerate(rows):
+                y = 6 + 16 * i
+                for col, (text, edge) in enumerate(zip(row, edges)):
+                    txt = font.render(text, True, WHITE)
+                    x = 8 + edge if col == 0 else 8 + edge - txt.get_width()
+                    overlay.blit(txt, (x, y))
+            self._profile_overlay = overlay
+        overlay = self._profile_overlay
+        return self.screen.blit(overlay, (WIDTH - overlay.get_width() - 8, HUD_H + 8))
+
+    def _draw(self) -> None:
+        if self._background_builds != self.sim.builds:
+            self._bake_background()
+
+        full = self._full_redraw or not self._dirty_rects_ok
+        if not full:
+            dirty_area = sum(r.width * r.height for r in self._dirty)
+            full = dirty_area > DIRTY_FULL_REDRAW_FRACTION * WIDTH * HEIGHT
+
+        if full:
+            self.screen.blit(self._background, (0, 0))
+        else:
+            # Erase last frame's sprites; everything is redrawn on top in order.
+            bg = self._background
+            self.screen.blits([(bg, r, r) for r in self._dirty], False)
+        self.profiler.lap("background")
+
+        drawn = self._draw_entities()
+
+        if full:
             pygame.display.flip()
+            self._full_redraw = False
+        else:
+            try:
+                pygame.display.update(_merge_dirty(self._dirty, drawn))
+            except pygame.error:
+                self._dirty_rects_ok = False
+                pygame.display.flip()
+        self._dirty = drawn
+        self.profiler.lap("flip")
 
+    @property
+    def paused(self) -> bool:
+        return not self._visible
+
+    def _update_pacing(self, cost: float) -> None:
+        # cost: seconds of work (not waiting) in the frame just run.
+        self.frame_ms += 0.1 * (cost * 1000.0 - self.frame_ms)
+        if self.paused:
+            hz = BACKGROUND_FPS
+        else:
+            budget_ms = 1000.0 / FPS
+            if self.frame_ms > budget_ms:
+                self._slow = True
+            elif self.frame_ms < SLOW_RECOVER * budget_ms:
+                self._slow = False
+            frog = self.sim.frog.rect
+            on_bank = self.sim.safe_bottom.contains(frog) or self.sim.safe_top.contains(frog)
+            idle = on_bank and time.perf_counter() - self._last_input > IDLE_AFTER_SECONDS
+            hz = IDLE_FPS if idle or self._slow or not self._focused else FPS
+        if hz != self.pacing_hz:
+            self.pacing_hz = hz
+            print(f"[frog] pacing {hz} Hz")
+
+    def _frame(self, dt: float) -> None:
+        # F3 takes effect here: switching on mid-frame would time this frame's laps
+        # from a stale start.
+        self.profiler.enabled = self._show_profile or self._profile_requested
+        self.profiler.start()
+        inp = self._poll_input()
+        self.profiler.lap("events")
+        if self.paused:
+            # Keep pumping events so we notice coming back, but don't simulate or draw.
+            self._accumulator = 0.0
+            self._pending.clear()
+            self._was_paused = True
+            return
+        if self._was_paused:
+            # Time spent paused isn't game time.
+            self._was_paused = False
+            dt = 0.0
+        self._pending.extend(inp.presses)
+        self._accumulator += dt
+        steps = 0
+        while self._accumulator >= self._sim_dt:
+            if steps == MAX_SIM_STEPS_PER_FRAME:
+                # Too far behind (slow device, stalled tab): drop the backlog rather
+                # than spending ever longer catching up.
+                self._accumulator = 0.0
+                break
+            self._remember_positions()
+            step_input = StepInput(tuple(self._pending), inp.left_held, inp.right_held)
+            self.sim.step(step_input)
+            if self.recorder is not None:
+                self.recorder.record(step_input, self.sim)
+            self._pending.clear()
+            self.profiler.lap("bookkeeping")
+            self._accumulator -= self._sim_dt
+            steps += 1
+        self._alpha = self._accumulator / self._sim_dt
+        self._draw()
+        self.profiler.end_frame()
+
+    def _shutdown(self) -> None:
+        if self.recorder is not None:
+            self.recorder.close()
+            print(f"[frog] recorded {self.recorder.frames} steps to {self.recorder.path}")
+        self._finish_profile()
         pygame.quit()
+
+    def _finish_profile(self) -> None:
+        # F3 alone only shows the overlay; the report is for --profile runs.
+        if not self._profile_requested or not self.profiler.frames:
+            return
+        if self.is_web:
+            print("[frog] profile " + json.dumps(self.profiler.report()))
+            return
+        self.profiler.dump(self._profile_out)
+        print(f"[frog] profile written to {self._profile_out}")
+
+    def run(self) -> None:
+        if self.sim is None:
+            self.load()
+        while self.running:
+            dt = self.clock.tick(self.pacing_hz) / 1000.0
+            start = time.perf_counter()
+            self._frame(dt)
+            self._update_pacing(time.perf_counter() - start)
+
+        self._shutdown()
         return
 
     async def run_async(self) -> None:
         # Web builds (pygbag/emscripten) need an async loop that yields.
         print("[frog] entered async loop")
-        running = True
-        while running:
-            self.clock.tick(FPS)
-            for event in pygame.event.get():
-                if event.type == pygame.QUIT:
-                    running = False
-                elif event.type == pygame.KEYDOWN:
-                    if event.key == pygame.K_ESCAPE:
-                        running = False
-                    elif event.key in (pygame.K_UP, pygame.K_w):
-                        self._attempt_hop(0, -STEP_Y)
-                    elif event.key in (pygame.K_DOWN, pygame.K_s):
-                        self._attempt_hop(0, STEP_Y)
-                    elif event.key in (pygame.K_LEFT, pygame.K_a):
-                        if self._current_support() is None:
-                            self._attempt_hop(-STEP_X, 0)
-                        else:
-                            self.last_horizontal_dir = -1
-                    elif event.key in (pygame.K_RIGHT, pygame.K_d):
-                        if self._current_support() is None:
-                            self._attempt_hop(STEP_X, 0)
-                        else:
-                            self.last_horizontal_dir = 1
-                    elif event.key == pygame.K_SPACE:
-                        self._attempt_hop(self.last_horizontal_dir * STEP_X, 0)
-
-                self._handle_touch_events(event)
-                if self.touch.enabled and event.type in (pygame.FINGERDOWN, pygame.MOUSEBUTTONDOWN):
-                    action = self.touch.consume_tap_action()
-                    if action == "up":
-                        self._attempt_hop(0, -STEP_Y)
-                    elif action == "down":
-                        self._attempt_hop(0, STEP_Y)
-                    elif action == "left":
-                        if self._current_support() is None:
-                            self._attempt_hop(-STEP_X, 0)
-                        else:
-                            self.last_horizontal_dir = -1
-                    elif action == "right":
-                        if self._current_support() is None:
-                            self._attempt_hop(STEP_X, 0)
-                        else:
-                            self.last_horizontal_dir = 1
-                    elif action == "jump":
-                        self._attempt_hop(self.last_horizontal_dir * STEP_X, 0)
-
-            self.frog.update()
-
-            for lane_id, plats in self.lanes.items():
-                for p in plats:
-                    p.update()
-                for p in plats:
-                    if not p.needs_wrap():
-                        continue
-                    if p.speed > 0:
-                        leftmost = min(plats, key=lambda q: q.rect.left)
-                        p.rect.right = leftmost.rect.left - self.lane_gap
-                    else:
-                        rightmost = max(plats, key=lambda q: q.rect.right)
-                        p.rect.left = rightmost.rect.right + self.lane_gap
-                ordered = sorted(plats, key=lambda q: q.rect.left)
-                for i in range(1, len(ordered)):
-                    prev = ordered[i - 1]
-                    cur = ordered[i]
-                    min_left = prev.rect.right + self.lane_gap
-                    if cur.rect.left < min_left:
-                        cur.rect.left = min_left
-
-            for c in self.crocs:
-                c.update()
-            for f in self.flies:
-                f.update()
-
-            in_water = self.water_area.collidepoint(self.frog.rect.center)
-            if in_water:
-                support = self._frog_on_platform()
-                if support is None:
-                    self._handle_death_reset()
-                else:
-                    self.frog.pos.x += support.dx_last
-                    self.frog.rect.center = (int(self.frog.pos.x), int(self.frog.pos.y))
-                    if self.frog.rect.right < 0 or self.frog.rect.left > WIDTH:
-                        self._handle_death_reset()
-                    else:
-                        self._walk_if_on_platform(support)
-                        self._clamp_frog_y_only()
-
-            for c in self.crocs:
-                if self.frog.rect.colliderect(c.rect):
-                    self._handle_death_reset()
-                    break
-
-            for i in range(len(self.flies) - 1, -1, -1):
-                if self.frog.rect.colliderect(self.flies[i].rect):
-                    self.score += 100
-                    self.flies[i] = Fly(self.water_area.inflate(-20, -20), 1.0 + 0.25 * (self.level - 1))
-
-            if self.frog.rect.colliderect(self.safe_top):
-                self._handle_level_complete()
-
-            self._draw_background()
-            for p in self.platforms:
-                p.draw(self.screen, self.sprites)
-            for c in self.crocs:
-                c.draw(self.screen, self.sprites)
-            for f in self.flies:
-                f.draw(self.screen, self.sprites)
-            self.frog.draw(self.screen, self.sprites)
-            if self.touch.enabled:
-                self.touch.draw(self.screen)
-            self._draw_hud()
-            pygame.display.flip()
-
-            await asyncio.sleep(0)
-
-        pygame.quit()
+        if self.sim is None:
+            await self.load_async()
+        while self.running:
+            start = time.perf_counter()
+            # No framerate argument: tick() only measures here, pacing is the sleep below.
+            dt = self.clock.tick() / 1000.0
+            self._frame(dt)
+            cost = time.perf_counter() - start
+            self._update_pacing(cost)
+            # Hand the rest of the frame budget back to the browser instead of
+            # spinning through sleep(0).
+            await asyncio.sleep(max(0.0, 1.0 / self.pacing_hz - cost))
+
+        self._shutdown()
         return
 
 
 class TouchControls:
+    BUTTONS = ("up", "down", "left", "right", "jump")
+    LABELS = {"up": "↑", "down": "↓", "left": "←", "right": "→", "jump": "J"}
+
     def __init__(self, enabled: bool):
         self.enabled = enabled
         self.left_held = False
         self.right_held = False
         self._tap_action: str | None = None
         self._active = False
+        # Button under the active touch, drawn with the pressed variant.
+        self.pressed: str | None = None
+        # The layout never changes, so hit-testing walks this fixed table.
+        self.rects = self._layout()
+        self._hits = tuple((name, self.rects[name]) for name in self.BUTTONS)
+        self._sheet: pygame.Surface | None = None
+        self._areas: dict[tuple[str, bool], pygame.Rect] = {}
 
     def _layout(self) -> dict[str, pygame.Rect]:
         pad = 14
@@ -950,6 +2221,32 @@ class TouchControls:
         jump = pygame.Rect(WIDTH - (size + pad), HEIGHT - (size + pad), size, size)
         return {"up": up, "down": down, "left": left, "right": right, "jump": jump}
 
+    def bake(self) -> None:
+        # One sheet: a row of normal buttons over a row of pressed ones. The loading
+        # screen bakes it; otherwise the first draw does (the label font needs
+        # pygame.font initialised).
+        size = max(r.width for r in self.rects.values())
+        sheet = pygame.Surface((size * len(self.BUTTONS), size * 2), pygame.SRCALPHA)
+        font = pygame.font.Font(None, 36)
+        for col, name in enumerate(self.BUTTONS):
+            r = self.rects[name]
+            alpha = 140 if name == "jump" else 110
+            txt = font.render(self.LABELS[name], True, (0, 0, 0))
+            for row, pressed in enumerate((False, True)):
+                area = pygame.Rect(col * size, row * size, r.width, r.height)
+                fill = (255, 230, 120, 200) if pressed else (255, 255, 255, alpha)
+                pygame.draw.rect(sheet, fill, area, border_radius=12)
+                pygame.draw.rect(sheet, (0, 0, 0, 140), area, 2, border_radius=12)
+                sheet.blit(txt, (area.centerx - txt.get_width() // 2, area.centery - txt.get_height() // 2))
+                self._areas[(name, pressed)] = area
+        self._sheet = sheet
+
+    def _hit(self, x: int, y: int) -> str | None:
+        for name, r in self._hits:
+            if r.collidepoint(x, y):
+                return name
+        return None
+
     def on_down(self, x: int, y: int) -> None:
         if not self.enabled:
             return
@@ -967,43 +2264,32 @@ class TouchControls:
         self._active = False
         self.left_held = False
         self.right_held = False
+        self.pressed = None
 
     def _update_state(self, x: int, y: int, is_tap: bool) -> None:
-        rects = self._layout()
+        name = self._hit(x, y)
+        self.pressed = name
         # Hold left/right for walking; tap any button triggers an action.
-        self.left_held = rects["left"].collidepoint(x, y)
-        self.right_held = rects["right"].collidepoint(x, y)
+        self.left_held = name == "left"
+        self.right_held = name == "right"
 
-        if not is_tap:
-            return
-        for name, r in rects.items():
-            if r.collidepoint(x, y):
-                self._tap_action = name
-                return
+        if is_tap and name is not None:
+            self._tap_action = name
 
     def consume_tap_action(self) -> str | None:
         action = self._tap_action
         self._tap_action = None
         return action
 
-    def draw(self, surf: pygame.Surface) -> None:
-        rects = self._layout()
-        # Minimal UI: translucent buttons
-        for name, r in rects.items():
-            fill = (255, 255, 255, 110)
-            if name == "jump":
-                fill = (255, 255, 255, 140)
-            box = pygame.Surface((r.width, r.height), pygame.SRCALPHA)
-            pygame.draw.rect(box, fill, box.get_rect(), border_radius=12)
-            pygame.draw.rect(box, (0, 0, 0, 140), box.get_rect(), 2, border_radius=12)
-            surf.blit(box, r.topleft)
-
-        # labels
-        label_map = {"up": "↑", "down": "↓", "left": "←", "right": "→", "jump": "J"}
-        font = pygame.font.SysFont(None, 36)
-        for name, r in rects.items():
-            txt = font.render(label_map[name], True, (0, 0, 0))
-            surf.blit(txt, (r.centerx - txt.get_width() // 2, r.centery - txt.get_height() // 2))
+    def draw(self, surf: pygame.Surface) -> list[pygame.Rect]:
+        if self._sheet is None:
+            self.bake()
+        sheet = self._sheet
+        areas = self._areas
+        pressed = self.pressed
+        return surf.blits(
+            [(sheet, r, areas[(name, name == pressed)]) for name, r in self._hits]
+        )
 
 
 def _render_fatal_error(message: str) -> None:
@@ -1055,6 +2341,14 @@ async def _web_entry() -> None:
         raise
 
 
+def _seed(text: str) -> int:
+    seed = int(text)
+    # Recordings store the seed as a signed 64-bit int.
+    if not -(2**63) <= seed < 2**63:
+        raise argparse.ArgumentTypeError(f"seed must fit in a signed 64-bit int, got {text}")
+    return seed
+
+
 def main() -> None:
     if sys.platform == "emscripten":
         # pygbag may already be running an asyncio loop; asyncio.run() would crash.
@@ -1066,7 +2360,18 @@ def main() -> None:
             loop.create_task(_web_entry())
         return
 
-    game = FrogCrossingGame()
+    parser = argparse.ArgumentParser(description="Frog Crossing")
+    parser.add_argument("--seed", type=_seed, help="level/fly RNG seed (default: random, printed at start)")
+    parser.add_argument("--record", metavar="FILE", help="record every sim step's input to FILE")
+    parser.add_argument("--replay", metavar="FILE", help="re-run a recording headless and verify its checksums")
+    args = parser.parse_args()
+
+    if args.replay:
+        from frog_replay import main as replay_main
+
+        sys.exit(replay_main([args.replay]))
+
+    game = FrogCrossingGame(seed=args.seed, record=args.record)
     game.run()
 
 
@@ -0,0 +1,254 @@
+# Gym-style environments over the headless FrogSim, plus a vectorized wrapper that
+# shards games across worker processes.
+#
+# FrogCrossingEnv follows the Gymnasium reset/step signatures without depending on
+# it. VectorFrogEnv runs each shard in its own process and exchanges observations,
+# rewards and actions through shared memory, so only tiny command messages cross
+# the pipes and rollouts scale with core count.
+
+import multiprocessing as mp
+import os
+from multiprocessing import shared_memory
+
+os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")
+
+import numpy as np
+
+from frog_batch import MAX_FLIES, MAX_LANES, MAX_PLATFORMS_PER_LANE
+from frog_crossing import ACTION_INPUTS, ACTIONS, HEIGHT, WIDTH, FrogSim
+
+
+# Observation layout (float32):
+#   frog:   x, y, move cooldown, last horizontal dir, lives left, in water
+#   lanes:  MAX_LANES x (present, center y, speed)
+#   plats:  MAX_LANES x MAX_PLATFORMS_PER_LANE x (left, right, has croc), in lane (x) order
+#   flies:  MAX_FLIES x (present, x, y)
+# Positions are divided by the screen size and speeds by 10, so values stay near [-1, 1].
+FROG_FEATURES = 6
+LANE_FEATURES = 3
+PLATFORM_FEATURES = 3
+FLY_FEATURES = 3
+OBS_SIZE = (
+    FROG_FEATURES
+    + MAX_LANES * LANE_FEATURES
+    + MAX_LANES * MAX_PLATFORMS_PER_LANE * PLATFORM_FEATURES
+    + MAX_FLIES * FLY_FEATURES
+)
+
+_LANES_AT = FROG_FEATURES
+_PLATS_AT = _LANES_AT + MAX_LANES * LANE_FEATURES
+_FLIES_AT = _PLATS_AT + MAX_LANES * MAX_PLATFORMS_PER_LANE * PLATFORM_FEATURES
+
+
+def observe(sim: FrogSim, out: np.ndarray) -> np.ndarray:
+    # Write sim's observation into out (one OBS_SIZE row, e.g. a shared-memory slice).
+    out[:] = 0.0
+    frog = sim.frog
+    out[0] = frog.pos.x / WIDTH
+    out[1] = frog.pos.y / HEIGHT
+    out[2] = frog._move_cooldown / 10.0
+    out[3] = sim.last_horizontal_dir
+    out[4] = sim.lives / sim.max_lives
+    out[5] = 1.0 if sim.water_area.collidepoint(frog.rect.center) else 0.0
+
+    crocs = {id(c.platform) for c in sim.crocs}
+    for lane_id, plats in sim.lanes.items():
+        at = _LANES_AT + lane_id * LANE_FEATURES
+        out[at] = 1.0
+        out[at + 1] = plats[0].rect.centery / HEIGHT
+        out[at + 2] = plats[0].speed / 10.0
+
+        at = _PLATS_AT + lane_id * MAX_PLATFORMS_PER_LANE * PLATFORM_FEATURES
+        for p in plats:
+            out[at] = p.rect.left / WIDTH
+            out[at + 1] = p.rect.right / WIDTH
+            out[at + 2] = 1.0 if id(p) in crocs else 0.0
+            at += PLATFORM_FEATURES
+
+    at = _FLIES_AT
+    for f in sim.flies:
+        out[at] = 1.0
+        out[at + 1] = f.pos.x / WIDTH
+        out[at + 2] = f.pos.y / HEIGHT
+        at += FLY_FEATURES
+    return out
+
+
+class FrogCrossingEnv:
+    # One game. Actions index ACTIONS; they go through FrogSim.press, so up/down/jump
+    # are _attempt_hop calls and left/right hop on land or walk while riding.
+    # Reward is the score delta (hops up, flies) minus death_penalty per lost life.
+    # An episode ends when the level is cleared or the last life is lost.
+    action_count = len(ACTIONS)
+    observation_size = OBS_SIZE
+
+    def __init__(self, level: int = 1, max_steps: int = 3600, death_penalty: float = 50.0, seed: int | None = None) -> None:
+        self.start_level = level
+        self.max_steps = max_steps
+        self.death_penalty = death_penalty
+        self._seed = seed
+        self.sim = FrogSim(level, seed=seed)
+        self.steps = 0
+        self.obs = np.zeros(OBS_SIZE, dtype=np.float32)
+
+    def reset(self, seed: int | None = None) -> tuple[np.ndarray, dict]:
+        if seed is not None:
+            self._seed = seed
+        elif self._seed is not None:
+            # Fresh, but still reproducible, episodes after the first one.
+            self._seed += 1_000_003
+        self.sim = FrogSim(self.start_level, seed=self._seed)
+        self.steps = 0
+        return observe(self.sim, self.obs), {"level": self.sim.level}
+
+    def step(self, action: int) -> tuple[np.ndarray, float, bool, bool, dict]:
+        score_before = self.sim.score
+        builds_before = self.sim.builds
+        result = self.sim.step(ACTION_INPUTS[action])
+        self.steps += 1
+
+        game_over = result.deaths > 0 and self.sim.builds != builds_before and not result.level_complete
+        reward = float(result.score - score_before) - self.death_penalty * result.deaths
+        terminated = result.level_complete or game_over
+        truncated = not terminated and self.steps >= self.max_steps
+        info = {
+            "score": result.score,
+            "level": result.level,
+            "lives": result.lives,
+            "level_complete": result.level_complete,
+            "game_over": game_over,
+        }
+        return observe(self.sim, self.obs), reward, terminated, truncated, info
+
+
+def _shard_bounds(num_envs: int, num_workers: int) -> list[tuple[int, int]]:
+    base, extra = divmod(num_envs, num_workers)
+    bounds = []
+    start = 0
+    for w in range(num_workers):
+        stop = start + base + (1 if w < extra else 0)
+        bounds.append((start, stop))
+        start = stop
+    return bounds
+
+
+def _worker(conn, shm_name: str, num_envs: int, lo: int, hi: int, env_kwargs: dict) -> None:
+    shm = shared_memory.SharedMemory(name=shm_name)
+    try:
+        obs, rewards, terminated, truncated, actions = _views(shm.buf, num_envs)
+        envs = [FrogCrossingEnv(**env_kwargs) for _ in range(lo, hi)]
+        while True:
+            cmd, arg = conn.recv()
+            if cmd == "reset":
+                for i, env in enumerate(envs):
+                    seed = None if arg is None else arg + lo + i
+                    obs[lo + i] = env.reset(seed=seed)[0]
+                conn.send(None)
+            elif cmd == "step":
+                for i, env in enumerate(envs):
+                    k = lo + i
+                    ob, reward, term, trunc, _ = env.step(int(actions[k]))
+                    rewards[k] = reward
+                    terminated[k] = term
+                    truncated[k] = trunc
+                    # Auto-reset: the slot holds the first observation of the next episode.
+                    obs[k] = env.reset()[0] if term or trunc else ob
+                conn.send(None)
+            elif cmd == "close":
+                break
+    finally:
+        del obs, rewards, terminated, truncated, actions
+        shm.close()
+        conn.close()
+
+
+def _views(buf, num_envs: int) -> tuple[np.ndarray, ...]:
+    # Carve one shared block into the per-step exchange arrays.
+    obs = np.ndarray((num_envs, OBS_SIZE), dtype=np.float32, buffer=buf)
+    at = obs.nbytes
+    rewards = np.ndarray((num_envs,), dtype=np.float32, buffer=buf, offset=at)
+    at += rewards.nbytes
+    terminated = np.ndarray((num_envs,), dtype=np.bool_, buffer=buf, offset=at)
+    at += terminated.nbytes
+    truncated = np.ndarray((num_envs,), dtype=np.bool_, buffer=buf, offset=at)
+    at += truncated.nbytes
+    actions = np.ndarray((num_envs,), dtype=np.int64, buffer=buf, offset=at)
+    return obs, rewards, terminated, truncated, actions
+
+
+def _shared_bytes(num_envs: int) -> int:
+    return num_envs * (OBS_SIZE * 4 + 4 + 1 + 1 + 8)
+
+
+class VectorFrogEnv:
+    # num_envs games split across num_workers processes. Env i is seeded with
+    # seed + i, so a run is reproducible regardless of the worker count.
+    # Finished episodes auto-reset in place.
+    def __init__(self, num_envs: int, num_workers: int | None = None, seed: int | None = None, **env_kwargs) -> None:
+        if num_workers is None:
+            num_workers = min(num_envs, os.cpu_count() or 1)
+        num_workers = max(1, min(num_workers, num_envs))
+        self.num_envs = num_envs
+        self.num_workers = num_workers
+        self._seed = seed
+
+        self._shm = shared_memory.SharedMemory(create=True, size=_shared_bytes(num_envs))
+        self.obs, self.rewards, self.terminated, self.truncated, self._actions = _views(self._shm.buf, num_envs)
+
+        # "spawn" behaves the same on Windows, macOS and Linux, and workers don't
+        # inherit pygame state from the parent.
+        ctx = mp.get_context("spawn")
+        self._conns = []
+        self._procs = []
+        for lo, hi in _shard_bounds(num_envs, num_workers):
+            parent, child = ctx.Pipe()
+            proc = ctx.Process(
+                target=_worker,
+                args=(child, self._shm.name, num_envs, lo, hi, env_kwargs),
+                daemon=True,
+            )
+            proc.start()
+            child.close()
+            self._conns.append(parent)
+            self._procs.append(proc)
+        self._closed = False
+
+    def _broadcast(self, cmd: str, arg=None) -> None:
+        for conn in self._conns:
+            conn.send((cmd, arg))
+        for conn in self._conns:
+            conn.recv()
+
+    def reset(self, seed: int | None = None) -> np.ndarray:
+        if seed is not None:
+            self._seed = seed
+        self._broadcast("reset", self._seed)
+        return self.obs.copy()
+
+    def step(self, actions) -> tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        self._actions[:] = actions
+        self._broadcast("step")
+        return self.obs.copy(), self.rewards.copy(), self.terminated.copy(), self.truncated.copy()
+
+    def close(self) -> None:
+        if self._closed:
+            return
+        self._closed = True
+        for conn in self._conns:
+            try:
+                conn.send(("close", None))
+            except (BrokenPipeError, OSError):
+                pass
+        for proc in self._procs:
+            proc.join(timeout=5)
+        for conn in self._conns:
+            conn.close()
+        del self.obs, self.rewards, self.terminated, self.truncated, self._actions
+        self._shm.close()
+        self._shm.unlink()
+
+    def __enter__(self) -> "VectorFrogEnv":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
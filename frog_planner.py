@@ -0,0 +1,414 @@
+# Crossing planner: decides whether a generated level can be crossed and finds the
+# fastest way across, without stepping the full simulation.
+#
+# Lane motion doesn't depend on the frog, so platform positions at any frame come from
+# the sim's LaneTimelines. The search then only moves the frog, with
+# the same rules FrogSim.step applies to it: hops with cooldown, snapping onto the
+# support under the landing spot, being carried, being carried off-screen, crocodiles
+# and the top bank. A riding frog keeps its offset from its platform, so a location
+# is "bank cell (x, y)" or "platform p, this lap, at offset o". The search sweeps
+# forward one frame at a time, trying every hop from every location reached so far
+# (skipping frames where the timelines say a hop would land just as it did before);
+# the first hop that lands on the top bank is the fastest crossing.
+#
+# The frog's moves are hops only (up, down, and a sideways hop, which is "left"/
+# "right" on land and "left"/"right" + "jump" while riding), and once in the water
+# it never hops back onto the start bank. Walking while riding isn't modelled, so a
+# level the planner rejects may still be crossable another way.
+# Plans are StepInputs, one per frame; verify_plan replays one through FrogSim.
+#
+#   python frog_planner.py --levels 1 5 10 --seeds 20
+
+import argparse
+import os
+import sys
+import time
+from dataclasses import dataclass
+
+os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")
+
+from frog_crossing import HUD_H, STEP_X, STEP_Y, Frog, FrogSim, StepInput
+
+
+HORIZON = 1800  # frames searched (30 s at 60 Hz)
+STALL_FRAMES = 360  # give up once no new row has been reached for this long
+X_BUCKET = 8  # px; frogs this close on the same platform count as one location
+HOP_COOLDOWN = 6  # frames from one hop to the next
+
+PLAN_INPUTS = {
+    "wait": StepInput(),
+    "up": StepInput(presses=("up",)),
+    "down": StepInput(presses=("down",)),
+    # On land "left" hops and the jump is swallowed by the cooldown; while riding,
+    # "left" only turns the frog and "jump" does the hop.
+    "left": StepInput(presses=("left", "jump")),
+    "right": StepInput(presses=("right", "jump")),
+}
+_HOPS = {"up": (0, -STEP_Y), "down": (0, STEP_Y), "left": (-STEP_X, 0), "right": (STEP_X, 0)}
+
+_HALF_W = Frog.w // 2
+_HALF_H = Frog.h // 2
+
+_DEAD = 0
+_ALIVE = 1
+_WON = 2
+_GOAL = ("goal",)
+
+
+@dataclass
+class Plan:
+    inputs: list[StepInput]  # one per frame, starting from the sim's current frame
+    hops: int
+
+    @property
+    def frames(self) -> int:
+        return len(self.inputs)
+
+
+class CrossingPlanner:
+    def __init__(self, sim: FrogSim, horizon: int = HORIZON) -> None:
+        self.sim = sim
+        self.horizon = horizon
+        self.lanes = sim.lane_timelines()
+        self._t0 = sim.frame - self.lanes.frame  # planner frame 0 in timeline frames
+        plats = sim.platforms
+        self.width = [p.rect.width for p in plats]
+        self.half_w = [p.rect.width // 2 for p in plats]
+        self.center_y = [p.rect.centery for p in plats]
+        self.dx = [int(p.speed) for p in plats]
+        # Frog center bounds (FrogSim._clamp_frog) for this sim's screen size.
+        self._screen_w = sim.width
+        self._min_x, self._max_x = _HALF_W, sim.width - _HALF_W
+        self._min_y, self._max_y = HUD_H + _HALF_H, sim.height - _HALF_H
+        croc = {c.platform.order for c in sim.crocs}
+        reach_y = _HALF_H + (sim.crocs[0].h // 2 if sim.crocs else 0)
+        self._croc_reach = _HALF_W + (sim.crocs[0].w // 2 if sim.crocs else 0)
+        # Frog center height -> platforms whose croc it could touch at that height.
+        self._croc_rows = {}
+        for y in range(self._min_y, self._max_y + 1):
+            self._croc_rows[y] = [i for i in sorted(croc) if abs(y - self.center_y[i]) < reach_y]
+        water = sim.water_area
+        self._water = (water.left, water.top, water.right, water.bottom)
+        self._top_bank_bottom = sim.safe_top.bottom
+
+    # --- frog rules (mirror FrogSim) -------------------------------------------------
+
+    def _in_water(self, x: int, y: int) -> bool:
+        left, top, right, bottom = self._water
+        return left <= x < right and top <= y < bottom
+
+    def _hop(self, t: int, x: int, y: int, dx: int, dy: int) -> tuple[int, int]:
+        x = min(self._max_x, max(self._min_x, x + dx))
+        y = min(self._max_y, max(self._min_y, y + dy))
+        if self._in_water(x, y):
+            q = self.lanes.support(x, y, self._t0 + t)
+            if q >= 0:
+                x = min(self._max_x, max(self._min_x, self.lanes.left(q, self._t0 + t) + self.half_w[q]))
+                y = min(self._max_y, max(self._min_y, self.center_y[q]))
+        return x, y
+
+    def _steady(self, t: int, x: int, y: int, vx: int, dx: int, dy: int) -> int:
+        # How many frames from t a hop by (dx, dy), from a frog moving vx px per frame,
+        # keeps landing the same way; 1 when that isn't easy to be sure of. Near the
+        # screen edges clamping makes every frame different.
+        hx, hy = x + dx, y + dy
+        if not (self._min_x <= hx <= self._max_x and self._min_y <= hy <= self._max_y and self._in_water(hx, hy)):
+            return 1
+        q, frames = self.lanes.support_until(hx, hy, self._t0 + t, vx)
+        if vx > 0:
+            frames = min(frames, (self._max_x - hx) // vx + 1)
+        elif vx < 0:
+            frames = min(frames, (hx - self._min_x) // -vx + 1)
+        if q < 0:
+            # Nothing to snap to, but a platform may still slide under the frog by the
+            # time the step resolves; then where it sits on it changes every frame.
+            q, later = self.lanes.support_until(hx, hy, self._t0 + t + 1, vx)
+            if q >= 0:
+                return 1
+            frames = min(frames, later)
+        else:
+            # The snap spot must stay where neither the clamp nor the ride after the
+            # hop can reach the edge.
+            d = self.dx[q]
+            margin = HOP_COOLDOWN * abs(d)
+            center = self.lanes.left(q, self._t0 + t) + self.half_w[q]
+            if not self._min_x + margin <= center <= self._max_x - margin:
+                return 1
+            if d > 0:
+                frames = min(frames, (self._max_x - margin - center) // d + 1)
+            elif d < 0:
+                frames = min(frames, (center - self._min_x - margin) // -d + 1)
+        return frames
+
+    def _resolve(self, t: int, x: int, y: int, q: int = -1) -> tuple[int, int, int]:
+        # End of step t-1: lanes are at frame t. q is the platform the frog was riding,
+        # if any. Returns (status, x, support).
+        lanes = self.lanes
+        t += self._t0
+        if self._in_water(x, y):
+            # Sitting wholly on q, nothing else can overlap the frog more.
+            if q >= 0:
+                left = lanes.left(q, t)
+                if not left <= x - _HALF_W or not x + _HALF_W <= left + self.width[q]:
+                    q = -1
+            if q < 0:
+                q = lanes.support(x, y, t)
+                if q < 0:
+                    return _DEAD, x, q
+            x += self.dx[q]
+            if x + _HALF_W < 0 or x - _HALF_W > self._screen_w:
+                return _DEAD, x, q
+        else:
+            q = -1
+        # Crocs sit on their platform's center, and bite on the banks too.
+        reach = self._croc_reach
+        half_w = self.half_w
+        for i in self._croc_rows[y]:
+            if -reach < x - lanes.left(i, t) - half_w[i] < reach:
+                return _DEAD, x, q
+        if y - _HALF_H < self._top_bank_bottom:
+            return _WON, x, q
+        return _ALIVE, x, q
+
+    def _ride(self, t: int, x: int, y: int, q: int) -> int:
+        # Last frame up to which the frog at (x, y) on q (or on land) at frame t is just
+        # carried along: wholly on its platform, clear of the screen edges and of
+        # crocs. Crocs ride in lockstep with q, so having survived frame t is enough.
+        if q < 0:
+            return t if self._croc_rows[y] else 1 << 30
+        d = self.dx[q]
+        left = self.lanes.left(q, self._t0 + t)
+        if not left <= x - _HALF_W or not x + _HALF_W <= left + self.width[q]:
+            return t
+        if d > 0:
+            return t + (self._screen_w - 1 - x) // d
+        if d < 0:
+            return t + x // -d
+        return 1 << 30
+
+    def _fly(self, t: int, x: int, y: int, q: int) -> tuple[int, int, int, int]:
+        # Frames t+1 .. t+HOP_COOLDOWN-1 after a hop pressed at step t (whose resolve
+        # already ran): the frog just rides. Returns (status, x, support, ready frame).
+        for s in range(t + 2, t + HOP_COOLDOWN + 1):
+            status, x, q = self._resolve(s, x, y, q)
+            if status != _ALIVE:
+                return status, x, q, s
+        return _ALIVE, x, q, t + HOP_COOLDOWN
+
+    # --- search ----------------------------------------------------------------------
+
+    def _start(self) -> tuple[int, int, int, int, list[StepInput]] | None:
+        # Let the current cooldown run out; returns (ready frame, x, y, support, inputs).
+        frog = self.sim.frog
+        x, y = frog.rect.centerx, frog.rect.centery
+        q = -1
+        if self._in_water(x, y):
+            q = self.lanes.support(x, y, self._t0)
+        inputs = []
+        t = 0
+        while frog._move_cooldown - t > 0:
+            status, x, q = self._resolve(t + 1, x, y, q)
+            if status != _ALIVE:
+                return None
+            inputs.append(PLAN_INPUTS["wait"])
+            t += 1
+        return t, x, y, q, inputs
+
+    def plan(self) -> Plan | None:
+        start = self._start()
+        if start is None:
+            return None
+        t0, x0, y0, q0, prefix = start
+        dx = self.dx
+
+        def key_of(x: int, y: int, q: int, t: int) -> tuple:
+            # Riding platform q, x - dx*t stays put; it also tells one lap of the
+            # ring from the next, where an earlier arrival no longer dominates.
+            # Landings clamped at the screen edge give a new offset every frame,
+            # hence the buckets.
+            if q < 0:
+                return (-1, x // X_BUCKET, y)
+            return (q, (x - dx[q] * t) // X_BUCKET, y)
+
+        # Sweep frame by frame. Every location reached so far is "active" (a frog
+        # could be waiting there); each frame, try every hop from every active one.
+        # The first winning hop is the fastest crossing.
+        start_key = key_of(x0, y0, q0, t0)
+        reached = {start_key: t0}
+        # key -> (parent key, frame the hop was pressed, action)
+        parent: dict[tuple, tuple | None] = {}
+        arrivals: dict[int, list] = {t0: [(start_key, x0, y0, None)]}
+        # key -> [x, y, support, frame x was taken at, last frame of plain riding]
+        active: dict[tuple, list[int]] = {}
+        last: dict[tuple, tuple] = {}  # (key, action) -> landing tried last frame
+        steady: dict[tuple, int] = {}  # (key, action) -> first frame worth trying again
+        hops = _HOPS.items()
+
+        top_y = y0
+        progress_t = t0
+        for t in range(t0, self.horizon - HOP_COOLDOWN):
+            for key, x, y, via in arrivals.pop(t, ()):
+                parent[key] = via
+                active[key] = [x, y, key[0], t, self._ride(t, x, y, key[0])]
+                if y < top_y:
+                    top_y = y
+                    progress_t = t
+            if (not active and not arrivals) or t - progress_t > STALL_FRAMES:
+                return None
+            for key, state in active.items():
+                x, y, q, since, _ = state
+                vx = dx[q] if q >= 0 else 0
+                x += vx * (t - since)
+                for action, (hop_x, hop_y) in hops:
+                    if q < 0 and (hop_y > 0 or (key, action) in last):
+                        continue  # along the bank: the same hop every frame
+                    if steady.get((key, action), 0) > t:
+                        continue  # lands the same way as last frame, only later
+                    steady[key, action] = t + self._steady(t, x, y, vx, hop_x, hop_y)
+                    hx, hy = self._hop(t, x, y, hop_x, hop_y)
+                    if hx == x and hy == y:
+                        continue
+                    status, fx, lq = self._resolve(t + 1, hx, hy)
+                    if status == _WON:
+                        parent[_GOAL] = (key, t, action)
+                        return self._rebuild(parent, prefix, t + 1)
+                    if status == _DEAD or (lq < 0 and q >= 0):
+                        continue
+                    landing = key_of(fx, hy, lq, t + 1)
+                    if last.get((key, action)) == landing:
+                        continue  # same landing as the previous frame, only later
+                    last[key, action] = landing
+                    if reached.get(landing, self.horizon) <= t + HOP_COOLDOWN:
+                        continue
+                    status, fx, lq, ready = self._fly(t, fx, hy, lq)
+                    if status != _ALIVE:
+                        continue
+                    reached[landing] = ready
+                    arrivals.setdefault(ready, []).append((landing, fx, hy, (key, t, action)))
+            # Everyone waiting rides one frame; only frogs near an edge or a croc need
+            # the full rules. A frog carried just past the screen edge leaves the water
+            # rect and stops riding (as in FrogSim): it's on land from then on.
+            dead = []
+            ashore = []
+            for key, state in active.items():
+                if state[4] > t:
+                    continue
+                x, y, q, since, _ = state
+                if q >= 0:
+                    x += dx[q] * (t - since)
+                status, x, lq = self._resolve(t + 1, x, y, q)
+                if status != _ALIVE:
+                    dead.append(key)
+                    continue
+                state[:] = [x, y, lq, t + 1, self._ride(t + 1, x, y, lq)]
+                if q >= 0 and lq < 0:
+                    ashore.append(key)
+            for key in dead:
+                del active[key]
+            for key in ashore:
+                state = active.pop(key)
+                land = key_of(state[0], state[1], -1, t + 1)
+                if land not in reached:
+                    reached[land] = t + 1
+                    parent[land] = parent[key]
+                    active[land] = state
+        return None
+
+    def _rebuild(self, parent: dict, prefix: list[StepInput], goal_t: int) -> Plan:
+        hops = []  # (press frame, action), last first
+        key = _GOAL
+        while parent[key] is not None:
+            key, t, action = parent[key]
+            hops.append((t, action))
+        hops.reverse()
+        inputs = list(prefix)
+        wait = PLAN_INPUTS["wait"]
+        for t, action in hops:
+            inputs.extend([wait] * (t - len(inputs)))
+            inputs.append(PLAN_INPUTS[action])
+        inputs.extend([wait] * (goal_t - len(inputs)))
+        return Plan(inputs, len(hops))
+
+
+def plan_crossing(sim: FrogSim, horizon: int = HORIZON) -> Plan | None:
+    return CrossingPlanner(sim, horizon).plan()
+
+
+def is_solvable(sim: FrogSim, horizon: int = HORIZON) -> bool:
+    return plan_crossing(sim, horizon) is not None
+
+
+def verify_plan(sim: FrogSim, plan: Plan) -> bool:
+    # Replay the plan through the real rules; the sim is left as it was.
+    snap = sim.snapshot()
+    require_solvable = sim.require_solvable
+    sim.require_solvable = False
+    try:
+        for inp in plan.inputs:
+            result = sim.step(inp)
+            if result.deaths:
+                return False
+            if result.level_complete:
+                return True
+        return False
+    finally:
+        sim.restore(snap)
+        sim.require_solvable = require_solvable
+
+
+class PlannerBot:
+    # Baseline bot: follows the fastest plan, replanning after a level change, a death
+    # or once the plan runs out. Waits in place when no crossing is found.
+    def __init__(self, horizon: int = HORIZON) -> None:
+        self.horizon = horizon
+        self._plan: list[StepInput] = []
+        self._at = 0
+        self._seen = (-1, -1)
+
+    def act(self, sim: FrogSim) -> StepInput:
+        seen = (sim.builds, sim.deaths)
+        if seen != self._seen or (self._plan and self._at >= len(self._plan)):
+            self._seen = seen
+            plan = plan_crossing(sim, self.horizon)
+            self._plan = plan.inputs if plan is not None else []
+            self._at = 0
+        if self._at >= len(self._plan):
+            return PLAN_INPUTS["wait"]
+        inp = self._plan[self._at]
+        self._at += 1
+        return inp
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Plan crossings for generated levels")
+    parser.add_argument("--levels", type=int, nargs="+", default=[1, 5, 10, 20])
+    parser.add_argument("--seeds", type=int, default=10, help="seeds 0..N-1 per level")
+    args = parser.parse_args(argv)
+
+    failed = 0
+    for level in args.levels:
+        times = []
+        frames = []
+        unsolved = 0
+        for seed in range(args.seeds):
+            sim = FrogSim(level, seed=seed)
+            start = time.perf_counter()
+            plan = plan_crossing(sim)
+            times.append((time.perf_counter() - start) * 1000.0)
+            if plan is None:
+                unsolved += 1
+                continue
+            frames.append(plan.frames)
+            if not verify_plan(sim, plan):
+                failed += 1
+                print(f"level {level} seed {seed}: plan does not replay")
+        crossed = f"mean {sum(frames) / len(frames):.0f} frames" if frames else "none crossed"
+        print(
+            f"level {level}: {args.seeds - unsolved}/{args.seeds} solvable, {crossed}, "
+            f"planning mean {sum(times) / len(times):.1f} ms, max {max(times):.1f} ms"
+        )
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
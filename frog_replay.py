@@ -0,0 +1,152 @@
+# Input recording and headless replay.
+#
+# A recording is the session seed plus the StepInput of every sim step, so replaying
+# it through a fresh FrogSim reproduces the session exactly. Each step also stores a
+# CRC32 of the sim state after it, and replay stops at the first step whose state
+# disagrees (a rules change, or a nondeterminism bug).
+#
+# File layout (little-endian):
+#   header: 8-byte magic, i64 seed, u16 start level
+#   step:   u8 flags (bit 0 left held, bit 1 right held, bits 2-7 press count),
+#           one u8 ACTIONS index per press, u32 state checksum
+#
+#   python frog_replay.py session.frogrec
+
+import os
+import struct
+import sys
+import time
+import zlib
+from array import array
+from dataclasses import dataclass
+
+os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")
+
+from frog_crossing import ACTIONS, SIM_HZ, FrogSim, StepInput
+
+
+MAGIC = b"FROGREC\x01"
+_HEADER = struct.Struct("<8sqH")
+_CHECKSUM = struct.Struct("<I")
+_MAX_PRESSES = 63
+_PRESS_CODES = {name: i for i, name in enumerate(ACTIONS)}
+
+
+def state_checksum(sim: FrogSim) -> int:
+    # Everything the rules read or write each step, except the RNG itself (any RNG
+    # divergence shows up in the next layout or fly respawn anyway).
+    frog = sim.frog
+    ints = array("q", (
+        sim.score, sim.level, sim.lives, sim.deaths, sim.flies_eaten, sim.frame,
+        frog._move_cooldown, sim.last_horizontal_dir, frog.rect.x, frog.rect.y,
+    ))
+    ints.extend(p.rect.x for p in sim.platforms)
+    ints.extend(c.rect.x for c in sim.crocs)
+    floats = array("d", (frog.pos.x, frog.pos.y))
+    for f in sim.flies:
+        floats.extend((f.pos.x, f.pos.y, f.vel.x, f.vel.y))
+    return zlib.crc32(floats.tobytes(), zlib.crc32(ints.tobytes()))
+
+
+class InputRecorder:
+    def __init__(self, path: str, seed: int, level: int = 1) -> None:
+        # Packed first, so a seed that doesn't fit fails before the file is created.
+        header = _HEADER.pack(MAGIC, seed, level)
+        self.path = path
+        self.frames = 0
+        self._fh = open(path, "wb")
+        self._fh.write(header)
+
+    def record(self, inp: StepInput, sim: FrogSim) -> None:
+        # Call right after sim.step(inp).
+        presses = inp.presses[:_MAX_PRESSES]
+        flags = (len(presses) << 2) | (2 if inp.right_held else 0) | (1 if inp.left_held else 0)
+        self._fh.write(bytes((flags, *(_PRESS_CODES[p] for p in presses))))
+        self._fh.write(_CHECKSUM.pack(state_checksum(sim)))
+        self.frames += 1
+
+    def close(self) -> None:
+        if not self._fh.closed:
+            self._fh.close()
+
+
+def read_recording(path: str) -> tuple[int, int, list[tuple[StepInput, int]]]:
+    # -> (seed, start level, [(input, checksum after the step), ...])
+    with open(path, "rb") as fh:
+        data = fh.read()
+    magic, seed, level = _HEADER.unpack_from(data)
+    if magic != MAGIC:
+        raise ValueError(f"{path}: not a Frog Crossing recording")
+
+    steps = []
+    inputs: dict[bytes, StepInput] = {}
+    at = _HEADER.size
+    end = len(data)
+    while at < end:
+        count = data[at] >> 2
+        key = data[at:at + 1 + count]
+        inp = inputs.get(key)
+        if inp is None:
+            flags = key[0]
+            inp = StepInput(
+                presses=tuple(ACTIONS[code] for code in key[1:]),
+                left_held=bool(flags & 1),
+                right_held=bool(flags & 2),
+            )
+            inputs[key] = inp
+        at += 1 + count
+        if at + _CHECKSUM.size > end:
+            break  # truncated tail (game killed mid-write)
+        steps.append((inp, _CHECKSUM.unpack_from(data, at)[0]))
+        at += _CHECKSUM.size
+    return seed, level, steps
+
+
+@dataclass
+class ReplayReport:
+    frames: int
+    seconds: float
+    mismatch_frame: int | None  # first step whose checksum differs, or None
+    final_score: int
+    final_level: int
+
+    @property
+    def speedup(self) -> float:
+        # How much faster than the real-time SIM_HZ the replay ran.
+        return self.frames / SIM_HZ / self.seconds if self.seconds else float("inf")
+
+
+def replay(path: str) -> ReplayReport:
+    seed, level, steps = read_recording(path)
+    sim = FrogSim(level, seed=seed)
+    mismatch = None
+    start = time.perf_counter()
+    for i, (inp, checksum) in enumerate(steps):
+        sim.step(inp)
+        if state_checksum(sim) != checksum:
+            mismatch = i
+            break
+    seconds = time.perf_counter() - start
+    frames = len(steps) if mismatch is None else mismatch + 1
+    return ReplayReport(frames, seconds, mismatch, sim.score, sim.level)
+
+
+def main(argv: list[str] | None = None) -> int:
+    args = sys.argv[1:] if argv is None else argv
+    if len(args) != 1:
+        print("usage: frog_replay.py RECORDING")
+        return 2
+    report = replay(args[0])
+    print(
+        f"{report.frames} steps in {report.seconds:.3f}s ({report.speedup:.0f}x real time), "
+        f"score {report.final_score}, level {report.final_level}"
+    )
+    if report.mismatch_frame is not None:
+        print(f"state diverged at step {report.mismatch_frame}")
+        return 1
+    print("all checksums match")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
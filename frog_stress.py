@@ -0,0 +1,208 @@
+# Stress mode: FrogSim at arbitrary entity counts and screen sizes, to find the
+# engine's headroom before designing bigger levels.
+#
+# Every level is built from the same LevelTuning (tuning_for_level(--level) with the
+# command-line overrides applied), so clearing a level or running out of lives just
+# rebuilds at the same load and the run is endless until --seconds is up. A seeded
+# random policy drives the frog. Frames run back to back with no frame cap; the report
+# gives the sustained frame rate and FrameProfiler's per-phase percentiles. --render
+# also draws every frame with the game's sprites, offscreen unless --window.
+#
+#   python frog_stress.py --lanes 40 --platforms 20 --flies 60 --crocs 0.8 --size 1920x1080
+#   python frog_stress.py --level 12 --render --seconds 20 --json stress.json
+
+import argparse
+import json
+import os
+import random
+import sys
+import time
+from dataclasses import replace
+from pathlib import Path
+
+os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")
+
+import pygame
+
+from benchmarks.run_benchmarks import POLICY_WEIGHTS
+from frog_crossing import (
+    ACTION_INPUTS,
+    BANK,
+    FPS,
+    HEIGHT,
+    WATER,
+    WIDTH,
+    FrameProfiler,
+    FrogSim,
+    SpriteBank,
+    tuning_for_level,
+)
+
+
+_POLICY_INPUTS = 4096
+
+
+def _size(text: str) -> tuple[int, int]:
+    w, _, h = text.lower().partition("x")
+    try:
+        return int(w), int(h)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected WIDTHxHEIGHT, got {text!r}") from None
+
+
+class StressRenderer:
+    # The game's draw order (background, platforms, crocs, flies, frog) at any size,
+    # without the window chrome, HUD or dirty-rect bookkeeping of FrogCrossingGame.
+    def __init__(self, sim: FrogSim, window: bool) -> None:
+        pygame.display.init()
+        self.screen = pygame.display.set_mode((sim.width, sim.height))
+        pygame.display.set_caption("Frog Crossing (stress)")
+        self.window = window
+        self.sprites = SpriteBank(Path(__file__).parent / "assets")
+        self.sprites.load_atlas()
+        self._background: pygame.Surface | None = None
+        self._builds = -1
+
+    def draw(self, sim: FrogSim, prof: FrameProfiler) -> None:
+        if self._builds != sim.builds:
+            bg = pygame.Surface(self.screen.get_size()).convert()
+            bg.fill(WATER)
+            pygame.draw.rect(bg, BANK, sim.safe_top)
+            pygame.draw.rect(bg, BANK, sim.safe_bottom)
+            self._background = bg
+            self._builds = sim.builds
+        screen = self.screen
+        screen.blit(self._background, (0, 0))
+        prof.lap("background")
+        sprites = self.sprites
+        for p in sim.platforms:
+            p.draw(screen, sprites)
+        for c in sim.crocs:
+            c.draw(screen, sprites)
+        for f in sim.flies:
+            f.draw(screen, sprites)
+        sim.frog.draw(screen, sprites)
+        prof.lap("entities")
+        if self.window:
+            pygame.display.flip()
+            prof.lap("flip")
+
+
+def run_stress(sim: FrogSim, seconds: float, render: bool = False, window: bool = False, seed: int = 0) -> dict:
+    prof = sim.profiler
+    renderer = StressRenderer(sim, window) if render else None
+    phases = ["bookkeeping", "frog", "lanes", "crocs_flies", "collide"]
+    if render:
+        phases += ["background", "entities"]
+    if window:
+        phases += ["events", "flip"]
+    # Policy inputs drawn up front (and cycled) so the RNG isn't part of the frames.
+    inputs = random.Random(seed).choices(ACTION_INPUTS, weights=POLICY_WEIGHTS, k=_POLICY_INPUTS)
+    builds_before = sim.builds
+    deaths_before = sim.deaths
+    frames = 0
+    start = time.perf_counter()
+    deadline = start + seconds
+    while frames % 64 or time.perf_counter() < deadline:
+        prof.start()
+        if window:
+            pygame.event.pump()
+            prof.lap("events")
+        sim.step(inputs[frames % _POLICY_INPUTS])
+        if renderer is not None:
+            renderer.draw(sim, prof)
+        prof.end_frame()
+        frames += 1
+    elapsed = time.perf_counter() - start
+
+    measured = prof.report()["phases_ms"]
+    total = measured["total"]
+    return {
+        "size": [sim.width, sim.height],
+        "tuning": vars(sim.tuning),
+        "entities": {
+            "platforms": len(sim.platforms),
+            "crocs": len(sim.crocs),
+            "flies": len(sim.flies),
+        },
+        "render": render,
+        "frames": frames,
+        "seconds": elapsed,
+        "fps": frames / elapsed,
+        # Share of one FPS-rate frame budget the p95 frame uses.
+        "budget_p95_pct": total["p95"] * FPS / 10.0,
+        "levels_built": sim.builds - builds_before,
+        "deaths": sim.deaths - deaths_before,
+        "phases_ms": {phase: measured[phase] for phase in (*phases, "total")},
+    }
+
+
+def _print_report(r: dict) -> None:
+    t = r["tuning"]
+    e = r["entities"]
+    print(
+        f"{r['size'][0]}x{r['size'][1]}, {t['lane_count']} lanes x {t['platform_count_per_lane']} platforms, "
+        f"croc chance {t['croc_chance']:.2f}, {t['fly_count']} flies, speed {t['base_speed']:.2f}"
+    )
+    print(f"entities: {e['platforms']} platforms, {e['crocs']} crocs, {e['flies']} flies")
+    print(
+        f"{r['frames']} frames in {r['seconds']:.1f}s: {r['fps']:.0f} fps sustained"
+        f"{' (rendered)' if r['render'] else ' (sim only)'}, "
+        f"p95 frame = {r['budget_p95_pct']:.0f}% of a {FPS} Hz budget"
+    )
+    print(f"levels built {r['levels_built']}, deaths {r['deaths']}")
+    print(f"{'phase':<12}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    for phase, values in r["phases_ms"].items():
+        print(f"{phase:<12}{values['p50']:>10.3f}{values['p95']:>10.3f}{values['p99']:>10.3f}")
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Frog Crossing stress / endless mode")
+    parser.add_argument("--level", type=int, default=1, help="start from this level's tuning (default 1)")
+    parser.add_argument("--lanes", type=int, help="lane count")
+    parser.add_argument("--platforms", type=int, help="platforms per lane")
+    parser.add_argument("--flies", type=int, help="fly count")
+    parser.add_argument("--crocs", type=float, help="chance (0..1) that a log carries a croc")
+    parser.add_argument("--speed", type=float, help="base lane speed, px per frame")
+    parser.add_argument("--size", type=_size, default=(WIDTH, HEIGHT), help=f"logical resolution (default {WIDTH}x{HEIGHT})")
+    parser.add_argument("--seconds", type=float, default=10.0)
+    parser.add_argument("--seed", type=int, default=1234)
+    parser.add_argument("--render", action="store_true", help="draw every frame too")
+    parser.add_argument("--window", action="store_true", help="render to a visible window (implies --render)")
+    parser.add_argument("--json", metavar="FILE", help="also write the report as JSON")
+    args = parser.parse_args(argv)
+
+    tuning = tuning_for_level(args.level)
+    overrides = {
+        "lane_count": args.lanes,
+        "platform_count_per_lane": args.platforms,
+        "fly_count": args.flies,
+        "croc_chance": args.crocs,
+        "base_speed": args.speed,
+    }
+    tuning = replace(tuning, **{k: v for k, v in overrides.items() if v is not None})
+    width, height = args.size
+    if tuning.lane_count < 1 or tuning.platform_count_per_lane < 1 or height < 200 or width < 200:
+        parser.error("need at least one lane and platform, and a size of at least 200x200")
+    if not args.window:
+        os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+
+    # Keep every frame: the report covers the whole run, not a rolling window.
+    window = max(1, int(args.seconds * 100_000))
+    prof = FrameProfiler(enabled=True, window=window)
+    sim = FrogSim(args.level, seed=args.seed, profiler=prof, width=width, height=height, tuning=tuning)
+    lane_h = sim.water_area.height // tuning.lane_count
+    if lane_h < 26:
+        print(f"note: lanes are {lane_h}px apart, platforms overlap the next lane's")
+
+    report = run_stress(sim, args.seconds, render=args.render or args.window, window=args.window, seed=args.seed)
+    _print_report(report)
+    if args.json:
+        Path(args.json).write_text(json.dumps(report, indent=2) + "\n")
+        print(f"report written to {args.json}")
+    pygame.quit()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
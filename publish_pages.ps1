@@ -24,7 +24,19 @@ if (-not $SkipBuild) {
         $restoreNestedGit = $true
     }
 
+    $spriteSources = "build\sprite_sources"
     try {
+        # Pack the sprites into assets\atlas.png, then keep the full-size source PNGs out
+        # of the web bundle (the game loads the atlas instead). Inside the try so a
+        # failure part-way still puts every moved PNG back.
+        & $python tools/build_atlas.py
+        if ($LASTEXITCODE -ne 0) { throw "tools/build_atlas.py failed." }
+        New-Item -ItemType Directory -Force $spriteSources | Out-Null
+        $atlasIndex = Get-Content "assets\atlas.json" -Raw | ConvertFrom-Json
+        foreach ($name in $atlasIndex.sprites.PSObject.Properties.Name) {
+            Move-Item "assets\$name.png" $spriteSources
+        }
+
         & $python -m pip install -U pygbag
         Remove-Item -Recurse -Force "build\web" -ErrorAction SilentlyContinue
         New-Item -ItemType Directory -Force "build\web" | Out-Null
@@ -53,6 +65,9 @@ if (-not $SkipBuild) {
         if ($restoreNestedGit -and (Test-Path $nestedGitHidden)) {
             Move-Item $nestedGitHidden $nestedGit
         }
+        if (Test-Path $spriteSources) {
+            Get-ChildItem $spriteSources -Filter *.png | Move-Item -Destination "assets"
+        }
     }
 }
 
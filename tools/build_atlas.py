@@ -0,0 +1,127 @@
+# Offline sprite atlas build.
+#
+# The sprite PNGs in assets/ are large source images that SpriteBank would otherwise
+# decode one by one, corner-probe for a colorkey and scale down at startup. This bakes
+# that colorkey into real transparency, scales each sprite to the sizes the game draws
+# it at (the *_SPRITE_SCALE_* constants over the hitboxes) and packs the results into
+# assets/atlas.png, indexed by assets/atlas.json. SpriteBank.load_atlas() reads both in
+# one go. The index keeps a CRC32 of every source, so a sprite edited after the build
+# loads from its PNG until the atlas is rebuilt.
+#
+#   python tools/build_atlas.py
+#   python tools/build_atlas.py --assets path/to/assets
+
+import argparse
+import json
+import os
+import sys
+import zlib
+from pathlib import Path
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+import pygame  # noqa: E402
+
+from frog_crossing import (  # noqa: E402
+    CROC_SPRITE_SCALE_X,
+    CROC_SPRITE_SCALE_Y,
+    FLY_SPRITE_SCALE_X,
+    FLY_SPRITE_SCALE_Y,
+    FROG_SPRITE_SCALE_X,
+    FROG_SPRITE_SCALE_Y,
+    PIXEL_ART_SPRITES,
+    SPRITE_ATLAS_INDEX,
+    Crocodile,
+    Fly,
+    Frog,
+    _corner_colorkey,
+)
+
+
+ATLAS_IMAGE = "atlas.png"
+ATLAS_WIDTH = 256
+PADDING = 1
+
+
+def draw_sizes() -> dict[str, list[tuple[int, int]]]:
+    # Every size the entities' draw() asks SpriteBank for. Logs and lilypads are drawn
+    # at per-platform widths, so they stay out of the atlas.
+    return {
+        "frog": [(Frog.w * FROG_SPRITE_SCALE_X, Frog.h * FROG_SPRITE_SCALE_Y)],
+        "croc": [(Crocodile.w * CROC_SPRITE_SCALE_X, Crocodile.h * CROC_SPRITE_SCALE_Y)],
+        "fly": [(Fly.r * 2 * FLY_SPRITE_SCALE_X, Fly.r * 2 * FLY_SPRITE_SCALE_Y)],
+    }
+
+
+def keyed(path: Path) -> pygame.Surface:
+    # The source with SpriteBank's corner colorkey turned into per-pixel alpha.
+    img = pygame.image.load(str(path)).convert_alpha()
+    _corner_colorkey(img)
+    out = pygame.Surface(img.get_size(), pygame.SRCALPHA)
+    out.fill((0, 0, 0, 0))
+    out.blit(img, (0, 0))
+    return out
+
+
+def pack(sizes: list[tuple[int, int]], width: int) -> tuple[list[tuple[int, int]], int]:
+    # Shelf packing, tallest first. -> (top-left per size, in input order; sheet height)
+    order = sorted(range(len(sizes)), key=lambda i: -sizes[i][1])
+    spots: list[tuple[int, int]] = [(0, 0)] * len(sizes)
+    x = y = shelf = 0
+    for i in order:
+        w, h = sizes[i]
+        if x and x + w > width:
+            x, y, shelf = 0, y + shelf + PADDING, 0
+        spots[i] = (x, y)
+        x += w + PADDING
+        shelf = max(shelf, h)
+    return spots, y + shelf
+
+
+def build(assets: Path) -> dict:
+    frames: list[tuple[str, pygame.Surface]] = []
+    crcs: dict[str, int] = {}
+    for name, sizes in draw_sizes().items():
+        path = assets / f"{name}.png"
+        if not path.exists():
+            continue  # the game draws a placeholder, nothing to pack
+        crcs[name] = zlib.crc32(path.read_bytes())
+        img = keyed(path)
+        scale = pygame.transform.scale if PIXEL_ART_SPRITES else pygame.transform.smoothscale
+        frames.extend((name, scale(img, size)) for size in sizes)
+
+    sizes = [img.get_size() for _, img in frames]
+    width = max([ATLAS_WIDTH, *(w for w, _ in sizes)])
+    spots, height = pack(sizes, width)
+    sheet = pygame.Surface((width, max(1, height)), pygame.SRCALPHA)
+    sheet.fill((0, 0, 0, 0))
+    index = {"image": ATLAS_IMAGE, "sprites": {name: {"crc32": crc, "frames": []} for name, crc in crcs.items()}}
+    for (name, img), (x, y) in zip(frames, spots):
+        sheet.blit(img, (x, y))
+        index["sprites"][name]["frames"].append([x, y, img.get_width(), img.get_height()])
+
+    pygame.image.save(sheet, str(assets / ATLAS_IMAGE))
+    (assets / SPRITE_ATLAS_INDEX).write_text(json.dumps(index, indent=2) + "\n")
+    return index
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Pack the sprite PNGs into one pre-keyed, pre-scaled atlas")
+    parser.add_argument("--assets", type=Path, default=ROOT / "assets")
+    args = parser.parse_args()
+
+    pygame.display.init()
+    pygame.display.set_mode((1, 1))  # convert_alpha() needs a display surface
+    index = build(args.assets)
+    pygame.quit()
+    count = sum(len(entry["frames"]) for entry in index["sprites"].values())
+    size = (args.assets / ATLAS_IMAGE).stat().st_size
+    print(f"packed {count} frames from {len(index['sprites'])} sprites into {ATLAS_IMAGE} ({size} bytes)")
+
+
+if __name__ == "__main__":
+    main()
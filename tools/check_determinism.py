@@ -0,0 +1,446 @@
+# Determinism and equivalence checks for the simulation.
+#
+# Several FrogSim paths are fast versions of something simpler (pooled rebuilds of
+# fresh objects, snapshots of stepping, ...), and seeded runs have to reproduce bit for
+# bit for replays to work. Each check plays seeded games both ways and reports the
+# first place they disagree. The exit status is 1 if any check fails.
+#
+#   python tools/check_determinism.py
+#   python tools/check_determinism.py --only pooling --quick
+
+import argparse
+import contextlib
+import io
+import os
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+import pygame  # noqa: E402
+
+from benchmarks.run_benchmarks import POLICY_WEIGHTS  # noqa: E402
+from frog_crossing import (  # noqa: E402
+    ACTION_INPUTS,
+    HEIGHT,
+    MAX_SIM_STEPS_PER_FRAME,
+    SIM_HZ,
+    SPATIAL_CELL,
+    WIDTH,
+    FrogCrossingGame,
+    FrogSim,
+    SpatialHash,
+)
+from frog_replay import InputRecorder, read_recording, replay, state_checksum  # noqa: E402
+
+
+class CheckFailed(Exception):
+    pass
+
+
+def _policy(seed: int, k: int) -> list:
+    return random.Random(seed).choices(ACTION_INPUTS, weights=POLICY_WEIGHTS, k=k)
+
+
+def _entities(sim: FrogSim) -> tuple:
+    # Every per-object field the rules read, static ones included.
+    return (
+        tuple((p.lane_id, p.order, tuple(p.rect), p.speed, p.kind, p.dx_last) for p in sim.platforms),
+        tuple((tuple(c.rect), c.platform.order, c.offset_x) for c in sim.crocs),
+        tuple((tuple(f.pos), tuple(f.vel), f.facing_deg, tuple(f.rect), tuple(f.area)) for f in sim.flies),
+        tuple((lane_id, tuple(p.order for p in ring)) for lane_id, ring in sim.lanes.items()),
+        (tuple(sim._band_lanes), tuple(sim._band_tops), tuple(sim._band_bottoms)),
+    )
+
+
+def check_pooling(quick: bool) -> str:
+    # A level built into a sim whose pools hold other levels' objects must come out
+    # exactly like the same level built fresh, and so must a snapshot restored after
+    # its objects were reused.
+    seeds = range(3 if quick else 8)
+    frames = 200 if quick else 600
+    for seed in seeds:
+        for level in (1, 6, 15):
+            fresh = FrogSim(level, seed=seed)
+            warm = FrogSim(20, seed=seed + 100)
+            for other in (3, 25, 1):  # grow and shrink the pools, dirtying what's in them
+                warm._build_level(other)
+                for inp in _policy(seed, 60):
+                    warm.step(inp)
+            warm.rng.seed(seed)
+            warm._build_level(level)
+            if _entities(warm) != _entities(fresh):
+                raise CheckFailed(f"level {level} seed {seed}: pooled build differs from a fresh one")
+
+            ref = FrogSim(level, seed=seed)
+            sim = FrogSim(level, seed=seed)
+            inputs = _policy(seed, frames * 2)
+            for inp in inputs[:frames]:
+                sim.step(inp)
+                ref.step(inp)
+            snap = sim.snapshot()
+            for other in (level + 7, 2, level + 14):
+                sim._build_level(other)
+                for inp in inputs[:50]:
+                    sim.step(inp)
+            sim.restore(snap)
+            for t, inp in enumerate(inputs[frames:], frames):
+                sim.step(inp)
+                ref.step(inp)
+                if state_checksum(sim) != state_checksum(ref) or _entities(sim) != _entities(ref):
+                    raise CheckFailed(f"level {level} seed {seed}: restore after rebuilds diverges at frame {t}")
+    return f"{len(seeds) * 3} pooled builds and restores match"
+
+
+def check_batch(quick: bool) -> str:
+    # BatchSim against FrogSim, one env per game, until the game draws from its RNG
+    # (a level build or fly respawn), after which the two engines' RNGs differ.
+    try:
+        import numpy as np
+
+        from frog_batch import BatchSim
+    except ImportError:
+        return "skipped, needs NumPy"
+    compared = 0
+    seeds = range(10 if quick else 40)
+    for seed in seeds:
+        level = (1, 3, 5, 9, 12)[seed % 5]
+        sim = FrogSim(level, seed=seed)
+        sim.frog._move_cooldown = 0
+        batch = BatchSim.from_sims([sim], seed=0)
+        actions = random.Random(seed + 1000).choices(range(len(ACTION_INPUTS)), weights=(8, 3, 1, 2, 2, 1), k=3000)
+        for t, action in enumerate(actions):
+            builds, eaten = sim.builds, sim.flies_eaten
+            sim.step(ACTION_INPUTS[action])
+            batch.step(np.array([action]))
+            if sim.builds != builds or sim.flies_eaten != eaten:
+                break
+            compared += 1
+            lefts = batch.platform_left()[0]
+            lanes = [
+                sorted(int(x) for x, valid in zip(lefts[lane], batch.plat_valid[0, lane]) if valid)
+                for lane in range(batch.lane_valid.shape[1])
+                if batch.lane_valid[0, lane]
+            ]
+            same = (
+                sim.frog.pos.x == batch.fx[0]
+                and sim.frog.pos.y == batch.fy[0]
+                and sim.frog._move_cooldown == batch.cooldown[0]
+                and sim.score == batch.score[0]
+                and sim.lives == batch.lives[0]
+                and [sorted(p.rect.x for p in ring) for ring in sim.lanes.values()] == lanes
+                and all(tuple(f.pos) == tuple(batch.fly_pos[0, j]) for j, f in enumerate(sim.flies))
+            )
+            if not same:
+                raise CheckFailed(f"level {level} seed {seed}: BatchSim differs from FrogSim at frame {t}")
+    return f"{compared} frames over {len(seeds)} games match"
+
+
+def check_timestep(quick: bool) -> str:
+    # The game loop at different render rates must run the same sim steps: the same
+    # count per second of frame time, with the same state after each one.
+    seconds = 3 if quick else 10
+    runs = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        for fps in (30, 40, 60, 144):
+            path = os.path.join(tmp, f"{fps}.frogrec")
+            with contextlib.redirect_stdout(io.StringIO()):
+                game = FrogCrossingGame(seed=5, record=path)
+                game.load()
+                for _ in range(fps * seconds):
+                    game._frame(1.0 / fps)
+                game._shutdown()
+            runs[fps] = [checksum for _, checksum in read_recording(path)[2]]
+    expected = SIM_HZ * seconds
+    for fps, sums in runs.items():
+        if abs(len(sums) - expected) > 1:
+            raise CheckFailed(f"{fps} fps ran {len(sums)} sim steps in {seconds}s, expected {expected}")
+        common = min(len(sums), len(runs[60]))
+        if sums[:common] != runs[60][:common]:
+            step = next(i for i in range(common) if sums[i] != runs[60][i])
+            raise CheckFailed(f"{fps} fps diverges from 60 fps at step {step}")
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        game = FrogCrossingGame(seed=5)
+        game.load()
+        game._frame(5.0)  # a stalled tab
+        game._shutdown()
+    if game.sim.frame != MAX_SIM_STEPS_PER_FRAME or game._accumulator:
+        raise CheckFailed(
+            f"a 5s frame ran {game.sim.frame} steps, expected {MAX_SIM_STEPS_PER_FRAME} and no backlog"
+        )
+    return f"30/40/60/144 fps run the same {expected} steps; stalls are capped"
+
+
+def check_replay(quick: bool) -> str:
+    # Recording a seeded game and replaying it must reproduce every step's checksum
+    # and the final score, and a game that drifts must be caught at that step.
+    frames = 1500 if quick else 6000
+    seeds = (0, -1, 2**63 - 1, -(2**63), 12345)
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "check.frogrec")
+        for seed in seeds:
+            sim = FrogSim(1, seed=seed)
+            recorder = InputRecorder(path, seed, sim.level)
+            for inp in _policy(seed, frames):
+                sim.step(inp)
+                recorder.record(inp, sim)
+            recorder.close()
+            report = replay(path)
+            if report.mismatch_frame is not None:
+                raise CheckFailed(f"seed {seed}: replay diverges at step {report.mismatch_frame}")
+            if (report.frames, report.final_score, report.final_level) != (frames, sim.score, sim.level):
+                raise CheckFailed(f"seed {seed}: replay ends at step {report.frames}, score {report.final_score}")
+
+        drift = frames // 2
+        sim = FrogSim(1, seed=7)
+        recorder = InputRecorder(path, 7, sim.level)
+        for t, inp in enumerate(_policy(7, frames)):
+            sim.step(inp)
+            if t == drift:
+                sim.frog.pos.x += 1e-9  # the kind of drift a nondeterminism bug leaves
+            recorder.record(inp, sim)
+        recorder.close()
+        report = replay(path)
+        if report.mismatch_frame != drift:
+            raise CheckFailed(f"drift at step {drift} reported at {report.mismatch_frame}")
+    return f"{len(seeds)} recordings of {frames} steps replay exactly; drift is caught"
+
+
+def check_snapshot(quick: bool) -> str:
+    # restore() of any snapshot, in any order and into any sim, must continue exactly
+    # as the game did from that step.
+    steps = 8000 if quick else 15000
+    window = 300 if quick else 600
+    inputs = random.Random(3).choices(ACTION_INPUTS, weights=(5, 4, 1, 2, 2, 1), k=steps)
+    sim = FrogSim(1, seed=11)
+    sums, rng_states, snaps = [], [], {}
+    for i, inp in enumerate(inputs):
+        # Often enough that most levels get several snapshots, which is what makes
+        # the lane rings' rotation matter (a layout is frozen at its first snapshot).
+        if i % 131 == 0:
+            snaps[i] = sim.snapshot()
+            rng_states.append((i, sim.rng.getstate()))
+        sim.step(inp)
+        sums.append(state_checksum(sim))
+    rng_at = dict(rng_states)
+    builds = sim.builds
+
+    order = list(snaps)
+    random.Random(3).shuffle(order)  # crosses level layouts both ways
+    targets = [(sim, i) for i in order] + [(FrogSim(7, seed=99), order[0])]
+    for target, i in targets:
+        target.restore(snaps[i])
+        if target.rng.getstate() != rng_at[i]:
+            raise CheckFailed(f"snapshot at step {i}: RNG state not restored")
+        for j in range(i, min(i + window, steps)):
+            target.step(inputs[j])
+            if state_checksum(target) != sums[j]:
+                raise CheckFailed(f"snapshot at step {i}: diverges at step {j}")
+    return f"{len(snaps)} snapshots over {builds} level builds resume exactly"
+
+
+def check_timelines(quick: bool) -> str:
+    # LaneTimelines against stepping the lanes: every platform's x at every frame,
+    # supports at sampled frog positions, and how long support_until says they hold.
+    levels = (1, 5, 12) if quick else (1, 2, 4, 5, 8, 10, 15, 20, 30)
+    seeds = range(2 if quick else 4)
+    frames = 1500 if quick else 3000
+    queries = 0
+    for level in levels:
+        for seed in seeds:
+            size = (1600, 900) if seed % 2 else (WIDTH, HEIGHT)
+            sim = FrogSim(level, seed=seed, width=size[0], height=size[1])
+            timelines = sim.lane_timelines()
+            rng = random.Random(seed)
+            area = sim.water_area
+            for t in range(frames):
+                if t:
+                    sim._update_lanes()
+                for p in sim.platforms:
+                    if timelines.left(p.order, t) != p.rect.x:
+                        raise CheckFailed(f"level {level} seed {seed}: platform {p.order} x wrong at frame {t}")
+                if t % 7:
+                    continue
+                for _ in range(10):
+                    x = rng.randrange(-20, sim.width + 20)
+                    y = rng.randrange(area.top, area.bottom)
+                    vx = rng.choice((0, 0, -5, -2, 3, 6))
+                    sim.frog.rect.center = (x, y)
+                    support = sim._frog_on_platform()
+                    want = -1 if support is None else support.order
+                    got, holds = timelines.support_until(x, y, t, vx)
+                    queries += 1
+                    if got != want:
+                        raise CheckFailed(
+                            f"level {level} seed {seed}: support at ({x}, {y}) frame {t} is {got}, not {want}"
+                        )
+                    for ahead in range(1, min(holds, 120)):
+                        if timelines.support(x + vx * ahead, y, t + ahead) != got:
+                            raise CheckFailed(
+                                f"level {level} seed {seed}: support_until at frame {t} holds {ahead}, not {holds}"
+                            )
+    return f"{len(levels) * len(seeds)} levels x {frames} frames, {queries} support queries match"
+
+
+class _Box:
+    __slots__ = ("rect",)
+
+    def __init__(self, rect: pygame.Rect) -> None:
+        self.rect = rect
+
+
+def _same(got: list, want: list) -> bool:
+    # Same entities, each returned once.
+    ids = [id(obj) for obj in got]
+    return len(ids) == len(set(ids)) and set(ids) == {id(obj) for obj in want}
+
+
+def check_grid(quick: bool) -> str:
+    # SpatialHash.query against a linear scan: first over boxes that drift, jump,
+    # and get swapped out, then over a seeded game's crocs and flies.
+    rng = random.Random(3)
+    steps = 300 if quick else 1500
+    queries = 0
+    for cell in (16, 64, SPATIAL_CELL):
+        grid = SpatialHash(cell)
+        boxes = []
+        for _ in range(120):
+            w, h = rng.randint(1, 200), rng.randint(1, 60)
+            boxes.append(_Box(pygame.Rect(rng.randint(-300, 1200), rng.randint(0, 700), w, h)))
+        grid.rebuild(boxes)
+        for step in range(steps):
+            for box in boxes:
+                if rng.random() < 0.02:
+                    box.rect.x = rng.randint(-300, 1200)
+                else:
+                    box.rect.move_ip(rng.randint(-4, 4), rng.randint(-2, 2))
+            grid.move_all(boxes)
+            if rng.random() < 0.05:
+                i = rng.randrange(len(boxes))
+                grid.remove(boxes[i])
+                boxes[i] = _Box(pygame.Rect(rng.randint(0, 900), rng.randint(0, 600), 12, 12))
+                grid.insert(boxes[i])
+            if rng.random() < 0.05:
+                box = rng.choice(boxes)
+                box.rect.topleft = (rng.randint(-300, 1200), rng.randint(0, 700))
+                grid.move(box)
+            for _ in range(5):
+                w, h = rng.randint(1, 80), rng.randint(1, 80)
+                area = pygame.Rect(rng.randint(-100, 1000), rng.randint(-50, 700), w, h)
+                queries += 1
+                if not _same(grid.query(area), [box for box in boxes if area.colliderect(box.rect)]):
+                    raise CheckFailed(f"cell {cell}: query {area} wrong at step {step}")
+
+    for seed in range(3 if quick else 10):
+        sim = FrogSim(1 + seed, seed=seed)
+        probe = sim.frog.rect.copy()
+        area = sim.water_area
+        for t, inp in enumerate(_policy(seed, steps * 2)):
+            sim.step(inp)
+            # Every entity where it is now, including a fly respawned this step.
+            for grid, entities in ((sim.croc_grid, sim.crocs), (sim.fly_grid, sim.flies)):
+                for obj in entities:
+                    queries += 1
+                    if obj not in grid.query(obj.rect):
+                        raise CheckFailed(f"seed {seed}: {type(obj).__name__} missing from its grid at frame {t}")
+            for _ in range(3):
+                probe.center = (rng.randrange(area.left, area.right), rng.randrange(area.top, area.bottom))
+                queries += 2
+                if not _same(sim.croc_grid.query(probe), [c for c in sim.crocs if probe.colliderect(c.rect)]):
+                    raise CheckFailed(f"seed {seed}: croc_grid wrong at frame {t}")
+                if not _same(sim.fly_grid.query(probe), [f for f in sim.flies if probe.colliderect(f.rect)]):
+                    raise CheckFailed(f"seed {seed}: fly_grid wrong at frame {t}")
+    return f"{queries} queries match a linear scan"
+
+
+def _scan_support(sim: FrogSim):
+    # The rule _frog_on_platform implements, written as the plain loop: biggest
+    # overlap wins, ties go to the platform earliest in sim.platforms.
+    best, best_area = None, 0
+    for p in sim.platforms:
+        inter = sim.frog.rect.clip(p.rect)
+        if inter.width * inter.height > best_area:
+            best, best_area = p, inter.width * inter.height
+    return best
+
+
+def check_support(quick: bool) -> str:
+    # FrogSim._frog_on_platform (lane bands and bisect) against a linear scan over
+    # sim.platforms: at the frog's own position every frame, and at sampled positions
+    # around platform edges and lane borders, where the bisects can be off by one.
+    levels = (1, 6, 15) if quick else (1, 2, 4, 6, 8, 10, 15, 20, 25, 30)
+    seeds = range(2 if quick else 4)
+    frames = 400 if quick else 1200
+    positions = 0
+    for level in levels:
+        for seed in seeds:
+            size = (1600, 900) if seed % 2 else (WIDTH, HEIGHT)
+            sim = FrogSim(level, seed=seed, width=size[0], height=size[1])
+            rng = random.Random(seed)
+            frog = sim.frog.rect
+            for t, inp in enumerate(_policy(seed, frames)):
+                sim.step(inp)
+                home = frog.copy()
+                for i in range(13):
+                    if i:
+                        p = rng.choice(sim.platforms)
+                        edges = (p.rect.left - frog.width, p.rect.left, p.rect.right - frog.width, p.rect.right)
+                        edge = rng.choice(edges)
+                        frog.x = edge + rng.randint(-2, 2) if i % 3 else rng.randrange(-40, sim.width + 40)
+                        frog.y = rng.choice((p.rect.top, p.rect.bottom)) + rng.randint(-frog.height, 2)
+                    positions += 1
+                    got, want = sim._frog_on_platform(), _scan_support(sim)
+                    if got is not want:
+                        orders = [None if q is None else q.order for q in (got, want)]
+                        raise CheckFailed(
+                            f"level {level} seed {seed}: frog at {tuple(frog)} frame {t} "
+                            f"is on {orders[0]}, not {orders[1]}"
+                        )
+                frog.topleft = home.topleft
+    return f"{len(levels) * len(seeds)} games, {positions} frog positions match a linear scan"
+
+
+CHECKS = {
+    "batch": check_batch,
+    "grid": check_grid,
+    "pooling": check_pooling,
+    "replay": check_replay,
+    "snapshot": check_snapshot,
+    "support": check_support,
+    "timelines": check_timelines,
+    "timestep": check_timestep,
+}
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Frog Crossing determinism checks")
+    parser.add_argument("--only", nargs="+", choices=list(CHECKS), help="run just these checks")
+    parser.add_argument("--quick", action="store_true", help="fewer seeds and frames")
+    args = parser.parse_args()
+
+    failed = 0
+    for name in args.only or CHECKS:
+        start = time.perf_counter()
+        try:
+            summary = CHECKS[name](args.quick)
+        except CheckFailed as exc:
+            failed += 1
+            print(f"FAIL {name}: {exc}")
+        except Exception as exc:
+            failed += 1
+            print(f"FAIL {name}: {type(exc).__name__}: {exc}")
+        else:
+            print(f"ok   {name}: {summary} ({time.perf_counter() - start:.1f}s)")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())